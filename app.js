@@ -50,11 +50,17 @@ const appData = {
   ]
 };
 
+// Hashed per-language response bundles, written by response_catalog.py
+const responseBundles = {"en": "locales/responses.en.bb3098860b.json", "es": "locales/responses.es.e82b1d3eca.json", "fr": "locales/responses.fr.1f00dc9846.json", "de": "locales/responses.de.ef27578af7.json", "it": "locales/responses.it.a41a3c9b9b.json", "pt": "locales/responses.pt.bc95c16bb2.json"};
+const loadedCatalogs = {};
+
 // Application State
 let currentLanguage = 'en';
+let responseCatalog = { language: 'en', responses: appData.sampleResponses, defaults: null };
 let isVoiceRecording = false;
 let chatHistory = [];
 let currentTheme = 'light';
+let sessionId = Math.random().toString(36).slice(2);
 let settings = {
   fontSize: 'medium',
   showTimestamps: true,
@@ -209,12 +215,30 @@ function sendMessage() {
   
   // Generate bot response with delay
   setTimeout(() => {
-    const response = generateBotResponse(message);
-    hideTypingIndicator();
-    addMessage('bot', response);
+    fetchBotResponse(message).then(response => {
+      hideTypingIndicator();
+      addMessage('bot', response);
+    });
   }, 1000 + Math.random() * 1000);
 }
 
+// Ask the local chat backend (chat_server.py) when the page is served over HTTP,
+// falling back to the in-browser keyword responses
+function fetchBotResponse(message) {
+  if (!window.location.protocol.startsWith('http')) {
+    return Promise.resolve(generateBotResponse(message));
+  }
+  
+  return fetch('/api/chat', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ session_id: sessionId, message, language: currentLanguage })
+  })
+    .then(response => response.ok ? response.json() : Promise.reject(response.status))
+    .then(data => data.message)
+    .catch(() => generateBotResponse(message));
+}
+
 function addMessage(type, message) {
   const timestamp = getCurrentTime();
   const messageData = { type, message, timestamp };
@@ -251,22 +275,22 @@ function generateBotResponse(userMessage) {
   
   // Context-aware responses based on user input
   if (message.includes('what is ivf') || message.includes('ivf') || (message.includes('what') && message.includes('ivf'))) {
-    return appData.sampleResponses.info;
+    return responseCatalog.responses.info;
   } else if (message.includes('cost') || message.includes('price') || message.includes('expensive') || message.includes('money')) {
-    return appData.sampleResponses.cost;
+    return responseCatalog.responses.cost;
   } else if (message.includes('success') || message.includes('rate') || message.includes('chance') || message.includes('odds')) {
-    return appData.sampleResponses.success;
+    return responseCatalog.responses.success;
   } else if (message.includes('timeline') || message.includes('how long') || message.includes('duration') || message.includes('time')) {
-    return appData.sampleResponses.timeline;
+    return responseCatalog.responses.timeline;
   } else if (message.includes('support') || message.includes('help') || message.includes('emotional') || message.includes('stress')) {
-    return appData.sampleResponses.support;
+    return responseCatalog.responses.support;
   } else if (message.includes('clinic') || message.includes('doctor') || message.includes('find') || message.includes('recommend')) {
-    return appData.sampleResponses.clinics;
+    return responseCatalog.responses.clinics;
   } else if (message.includes('hello') || message.includes('hi') || message.includes('hey') || message.includes('greeting')) {
-    return appData.sampleResponses.greeting;
+    return responseCatalog.responses.greeting;
   } else {
     // Default empathetic responses
-    const responses = [
+    const responses = responseCatalog.defaults || [
       "I understand your concern. Could you provide more specific details so I can give you the most accurate guidance? I'm here to help with all aspects of your fertility journey.",
       "That's a great question about fertility treatment. Let me help you understand this better. Would you like me to explain the process step by step?",
       "I'm here to support you through this journey. Could you tell me more about your specific situation? Every fertility journey is unique.",
@@ -401,18 +425,18 @@ function renderQuickActions() {
 
 function handleQuickAction(actionId) {
   const responses = {
-    info: appData.sampleResponses.info,
+    info: responseCatalog.responses.info,
     cost: function() {
       openModal('calculatorModal');
-      return appData.sampleResponses.cost;
+      return responseCatalog.responses.cost;
     },
-    success: appData.sampleResponses.success,
+    success: responseCatalog.responses.success,
     timeline: function() {
       openModal('timelineModal');
-      return appData.sampleResponses.timeline;
+      return responseCatalog.responses.timeline;
     },
-    clinics: appData.sampleResponses.clinics,
-    support: appData.sampleResponses.support
+    clinics: responseCatalog.responses.clinics,
+    support: responseCatalog.responses.support
   };
   
   let response = responses[actionId];
@@ -476,11 +500,12 @@ function renderLanguageOptions() {
     
     languageElement.addEventListener('click', () => {
       currentLanguage = language.code;
-      updateLanguageSelection();
       closeModal('languageModal');
       
-      // Simulate language change
-      addMessage('bot', `Language changed to ${language.name}. I can now assist you in ${language.name}. How can I help you today?`);
+      updateLanguageSelection().then(catalog => {
+        const changed = catalog.language === language.code && catalog.responses.language_changed;
+        addMessage('bot', changed || `Language changed to ${language.name}. I can now assist you in ${language.name}. How can I help you today?`);
+      });
     });
     
     languageGrid.appendChild(languageElement);
@@ -491,6 +516,32 @@ function updateLanguageSelection() {
   document.querySelectorAll('.language-option').forEach((option, index) => {
     option.classList.toggle('selected', appData.languages[index].code === currentLanguage);
   });
+  
+  const language = currentLanguage;
+  return loadResponseCatalog(language).then(catalog => {
+    // Ignore bundles that arrive after the user already picked another language
+    if (catalog && language === currentLanguage) {
+      responseCatalog = catalog;
+    }
+    return responseCatalog;
+  });
+}
+
+// Fetches a language's response bundle the first time it is selected; English
+// ships inline as appData.sampleResponses
+function loadResponseCatalog(language) {
+  if (loadedCatalogs[language]) {
+    return Promise.resolve(loadedCatalogs[language]);
+  }
+  const bundle = responseBundles[language];
+  if (!bundle || !window.location.protocol.startsWith('http')) {
+    return Promise.resolve(null);
+  }
+  
+  return fetch(bundle)
+    .then(response => response.ok ? response.json() : Promise.reject(response.status))
+    .then(catalog => (loadedCatalogs[language] = catalog))
+    .catch(() => null);
 }
 
 function setupCalculatorControls() {
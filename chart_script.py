@@ -1,5 +1,12 @@
 import plotly.graph_objects as go
+import argparse
 import json
+import os
+import sys
+from contextlib import nullcontext
+
+from instrumentation import add_arguments, finish, profiler_from_args, stage
+from journey_layout import layout_journey
 
 # Parse the data
 data = {
@@ -58,91 +65,20 @@ type_config = {
     "action": {"color": "#B4413C", "symbol": "square", "size": 25}
 }
 
-# Create the figure
-fig = go.Figure()
-
-# Add nodes
-for step_data in data["user_journey"]:
-    step = step_data["step"]
-    step_type = step_data["type"]
-    x, y = positions[step]
-    
-    config = type_config[step_type]
-    
-    # Abbreviate long step names to fit 15 char limit
-    display_name = step
-    if len(step) > 15:
-        if step == "Feature Selection":
-            display_name = "Feature Select"
-        elif step == "Document Upload":
-            display_name = "Doc Upload"
-        elif step == "Cost Calculator":
-            display_name = "Cost Calc"
-        elif step == "Appointment Booking":
-            display_name = "Booking"
-        elif step == "Language Selection":
-            display_name = "Language"
-        elif step == "Educational Content":
-            display_name = "Education"
-        elif step == "Personalization":
-            display_name = "Personaliz"
-        elif step == "Export Options":
-            display_name = "Export"
-    
-    fig.add_trace(go.Scatter(
-        x=[x], y=[y],
-        mode='markers+text',
-        marker=dict(
-            symbol=config["symbol"],
-            size=config["size"],
-            color=config["color"],
-            line=dict(width=2, color='white')
-        ),
-        text=[display_name],
-        textposition="middle center",
-        textfont=dict(size=11, color='white', family="Arial Black"),
-        hovertemplate=f"<b>{step}</b><br>{step_data['description']}<extra></extra>",
-        showlegend=False,
-        name=""
-    ))
 
-# Add arrows for connections
-for interaction in data["interactions"]:
-    from_step = interaction["from"]
-    to_step = interaction["to"]
-    
-    from_pos = positions[from_step]
-    to_pos = positions[to_step]
-    
-    # Calculate arrow direction
-    dx = to_pos[0] - from_pos[0]
-    dy = to_pos[1] - from_pos[1]
-    
-    # Adjust start and end points to avoid overlapping with nodes
-    arrow_length = (dx**2 + dy**2)**0.5
-    if arrow_length > 0:
-        unit_dx = dx / arrow_length
-        unit_dy = dy / arrow_length
-        
-        start_x = from_pos[0] + unit_dx * 0.8
-        start_y = from_pos[1] + unit_dy * 0.8
-        end_x = to_pos[0] - unit_dx * 0.8
-        end_y = to_pos[1] - unit_dy * 0.8
-        
-        fig.add_annotation(
-            x=end_x, y=end_y,
-            ax=start_x, ay=start_y,
-            xref="x", yref="y",
-            axref="x", ayref="y",
-            arrowhead=2,
-            arrowsize=1.5,
-            arrowwidth=2,
-            arrowcolor="#666666",
-            opacity=0.8
-        )
-
-# Create legend manually positioned on the left
-legend_y = 9
+# Abbreviate long step names to fit 15 char limit
+display_names = {
+    "Feature Selection": "Feature Select",
+    "Document Upload": "Doc Upload",
+    "Cost Calculator": "Cost Calc",
+    "Appointment Booking": "Booking",
+    "Language Selection": "Language",
+    "Educational Content": "Education",
+    "Personalization": "Personaliz",
+    "Export Options": "Export"
+}
+
+# Legend entries, manually positioned on the left
 legend_items = [
     ("Entry Point", "#1FB8CD"),
     ("Bot Response", "#DB4545"),
@@ -152,12 +88,162 @@ legend_items = [
     ("User Action", "#B4413C")
 ]
 
-for i, (label, color) in enumerate(legend_items):
+
+# Above this many nodes, figures switch to WebGL traces and plain edge lines,
+# since thousands of SVG markers and arrow annotations are too slow to draw
+WEBGL_NODE_THRESHOLD = 300
+
+
+def display_name(step):
+    return display_names.get(step, step) if len(step) > 15 else step
+
+
+def edge_annotations(interactions, positions):
+    # One arrow annotation per edge, built as plain dicts so the whole list is
+    # handed to the layout at once instead of validated one add_annotation at a time
+    annotations = []
+    for interaction in interactions:
+        from_pos = positions[interaction["from"]]
+        to_pos = positions[interaction["to"]]
+
+        # Calculate arrow direction
+        dx = to_pos[0] - from_pos[0]
+        dy = to_pos[1] - from_pos[1]
+
+        # Adjust start and end points to avoid overlapping with nodes
+        arrow_length = (dx**2 + dy**2)**0.5
+        if arrow_length > 0:
+            unit_dx = dx / arrow_length
+            unit_dy = dy / arrow_length
+            annotations.append(dict(
+                x=to_pos[0] - unit_dx * 0.8, y=to_pos[1] - unit_dy * 0.8,
+                ax=from_pos[0] + unit_dx * 0.8, ay=from_pos[1] + unit_dy * 0.8,
+                xref="x", yref="y",
+                axref="x", ayref="y",
+                arrowhead=2,
+                arrowsize=1.5,
+                arrowwidth=2,
+                arrowcolor="#666666",
+                opacity=0.8
+            ))
+    return annotations
+
+
+def fit_ranges(positions):
+    # Axis ranges around the nodes, with room for the legend on the left
+    xs = [x for x, _ in positions.values()]
+    ys = [y for _, y in positions.values()]
+    return (min(xs) - 6, max(xs) + 2), (min(ys) - 1, max(ys) + 1)
+
+
+def edge_lines(interactions, positions):
+    # All edges as one line trace (None breaks the segments), for WebGL figures
+    xs, ys = [], []
+    for interaction in interactions:
+        (x0, y0), (x1, y1) = positions[interaction["from"]], positions[interaction["to"]]
+        xs += [x0, x1, None]
+        ys += [y0, y1, None]
+    return go.Scattergl(x=xs, y=ys, mode='lines', line=dict(width=1, color="#666666"),
+                        opacity=0.6, hoverinfo='skip', showlegend=False, name="")
+
+
+def load_graph(path):
+    # A journey graph in the shape of data (e.g. mined from logs); raises
+    # ValueError when it cannot be charted
+    with open(path, encoding='utf-8') as f:
+        graph = json.load(f)
+    if not isinstance(graph, dict) or not {"user_journey", "interactions"} <= graph.keys():
+        raise ValueError("expected an object with user_journey and interactions lists")
+    steps = {step["step"] for step in graph["user_journey"]}
+    unknown_types = sorted({step["type"] for step in graph["user_journey"]} - type_config.keys())
+    if unknown_types:
+        raise ValueError(f"unknown step types: {', '.join(unknown_types)}")
+    unknown_steps = sorted({interaction[end] for interaction in graph["interactions"]
+                            for end in ("from", "to")} - steps)
+    if unknown_steps:
+        raise ValueError(f"interactions refer to unknown steps: {', '.join(unknown_steps)}")
+    return graph
+
+
+def graph_positions(graph, auto_layout=False):
+    # The hand-placed positions when they cover every step (the bundled graph),
+    # otherwise the layered layout
+    if not auto_layout and all(step["step"] in positions for step in graph["user_journey"]):
+        return positions
+    with stage('layout'):
+        return layout_journey(graph)
+
+
+def add_graph_arguments(parser):
+    parser.add_argument('--data', metavar='JSON', help="chart this journey graph ({\"user_journey\": [...], "
+                        "\"interactions\": [...]}) instead of the bundled one; laid out automatically")
+    parser.add_argument('--auto-layout', action='store_true', help="use the layered layout for the bundled graph too")
+
+
+def graph_from_args(parser, args):
+    if not args.data:
+        return data
+    try:
+        return load_graph(args.data)
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        parser.error(f"--data {args.data}: {error}")
+
+
+def build_figure(data, positions=None, title="FertilityAI User Flow", x_range=None, y_range=None, webgl=None):
+    # positions defaults to the automatic layered layout; webgl defaults to on for
+    # graphs above WEBGL_NODE_THRESHOLD nodes
+    if positions is None:
+        with stage('layout'):
+            positions = layout_journey(data)
+    if x_range is None or y_range is None:
+        fit_x, fit_y = fit_ranges(positions)
+        x_range = x_range or fit_x
+        y_range = y_range or fit_y
+    if webgl is None:
+        webgl = len(data["user_journey"]) > WEBGL_NODE_THRESHOLD
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    fig = go.Figure()
+    if webgl:
+        fig.add_trace(edge_lines(data["interactions"], positions))
+
+    # Add nodes: one trace per node type rather than one per node
+    steps_by_type = {step_type: [] for step_type in type_config}
+    for step_data in data["user_journey"]:
+        steps_by_type[step_data["type"]].append(step_data)
+
+    for step_type, steps in steps_by_type.items():
+        if not steps:
+            continue
+        config = type_config[step_type]
+        fig.add_trace(scatter(
+            x=[positions[step["step"]][0] for step in steps],
+            y=[positions[step["step"]][1] for step in steps],
+            mode='markers' if webgl else 'markers+text',
+            marker=dict(
+                symbol=config["symbol"],
+                size=config["size"],
+                color=config["color"],
+                line=dict(width=2, color='white')
+            ),
+            text=[display_name(step["step"]) for step in steps],
+            customdata=[[step["step"], step["description"]] for step in steps],
+            textposition="middle center",
+            textfont=dict(size=11, color='white', family="Arial Black"),
+            hovertemplate="<b>%{customdata[0]}</b><br>%{customdata[1]}<extra></extra>",
+            showlegend=False,
+            name=""
+        ))
+
+    # Legend as a single trace
+    legend_x = x_range[0] + 2
+    legend_y = y_range[1] - 2
     fig.add_trace(go.Scatter(
-        x=[-8], y=[legend_y - i*0.8],
+        x=[legend_x] * len(legend_items),
+        y=[legend_y - i*0.8 for i in range(len(legend_items))],
         mode='markers+text',
-        marker=dict(size=18, color=color, symbol='square'),
-        text=[label],
+        marker=dict(size=18, color=[color for _, color in legend_items], symbol='square'),
+        text=[label for label, _ in legend_items],
         textposition="middle right",
         textfont=dict(size=11),
         showlegend=False,
@@ -165,29 +251,50 @@ for i, (label, color) in enumerate(legend_items):
         name=""
     ))
 
-# Update layout
-fig.update_layout(
-    title="FertilityAI User Flow",
-    title_x=0.5,
-    xaxis=dict(
-        range=[-10, 8],
-        showgrid=False,
-        showticklabels=False,
-        zeroline=False,
-        visible=False
-    ),
-    yaxis=dict(
-        range=[-1, 11],
-        showgrid=False,
-        showticklabels=False,
-        zeroline=False,
-        visible=False
-    ),
-    plot_bgcolor='white',
-    paper_bgcolor='white',
-    showlegend=False
-)
-
-# Save the chart
-fig.write_image("fertility_ai_flowchart.png", width=1200, height=800)
-print("Chart saved as fertility_ai_flowchart.png")
\ No newline at end of file
+    # Update layout
+    fig.update_layout(
+        title=title,
+        title_x=0.5,
+        annotations=[] if webgl else edge_annotations(data["interactions"], positions),
+        xaxis=dict(
+            range=list(x_range),
+            showgrid=False,
+            showticklabels=False,
+            zeroline=False,
+            visible=False
+        ),
+        yaxis=dict(
+            range=list(y_range),
+            showgrid=False,
+            showticklabels=False,
+            zeroline=False,
+            visible=False
+        ),
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        showlegend=False
+    )
+    return fig
+
+
+def main(argv=None):
+    from chart_service import ChartService
+
+    parser = argparse.ArgumentParser(description="Render the FertilityAI user flow chart")
+    parser.add_argument('--out', default="fertility_ai_flowchart.png", help="image file to write")
+    add_graph_arguments(parser)
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    graph = graph_from_args(parser, args)
+
+    profiler = profiler_from_args('chart_script', args, os.path.dirname(os.path.abspath(args.out)))
+    with profiler or nullcontext():
+        # Save the chart; unchanged data is served from the render cache
+        with ChartService() as service:
+            service.render(graph, graph_positions(graph, args.auto_layout), args.out)
+    print(f"Chart saved as {args.out}")
+    return finish(profiler, args) if profiler else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
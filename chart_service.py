@@ -0,0 +1,206 @@
+# Batch flowchart rendering for chart_script.py.
+# Keeps one Kaleido renderer alive for every chart in a batch and caches rendered
+# images by a content hash of the journey data, so per-clinic/per-language runs
+# only render the charts whose data actually changed.
+import argparse
+import copy
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import chart_script
+from chart_script import (add_graph_arguments, build_figure, data, display_name, graph_from_args, graph_positions,
+                          positions, type_config)
+from instrumentation import stage
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, '.chart_cache')
+
+# Bump when build_figure's styling changes so stale cached images are not reused
+RENDER_VERSION = 1
+
+
+class ChartService:
+
+    def __init__(self, cache_dir=CACHE_DIR, width=1200, height=800):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.height = height
+        self.rendered = 0
+        self.cached = 0
+        self._server = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        # Kaleido >= 1.0 renders through headless Chrome; starting the sync server
+        # keeps one browser for the whole batch instead of one per write_image.
+        # Older Kaleido keeps its process alive between calls on its own.
+        try:
+            import kaleido
+            with stage('kaleido_start'):
+                kaleido.start_sync_server(silence_warnings=True)
+            self._server = True
+        except (ImportError, AttributeError):
+            pass
+
+    def stop(self):
+        if self._server:
+            import kaleido
+            kaleido.stop_sync_server(silence_warnings=True)
+            self._server = False
+
+    def cache_key(self, data, positions, title, image_format, layout=None):
+        payload = json.dumps({
+            "version": RENDER_VERSION,
+            "data": data,
+            "positions": positions,
+            "type_config": type_config,
+            "title": title,
+            "layout": layout or {},
+            "size": [self.width, self.height],
+            "format": image_format,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def render(self, data, positions, path, title="FertilityAI User Flow", **layout):
+        # Writes the chart to path, rendering only if this content was never rendered
+        image_format = os.path.splitext(path)[1].lstrip('.') or 'png'
+        key = self.cache_key(data, positions, title, image_format, layout)
+        cached_path = os.path.join(self.cache_dir, f'{key}.{image_format}')
+        if os.path.exists(cached_path):
+            self.cached += 1
+        else:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with stage('build_figure'):
+                fig = build_figure(data, positions, title, **layout)
+            # Write to a temporary name so an interrupted render never poisons the cache
+            partial_path = f'{cached_path}.{os.getpid()}.tmp.{image_format}'
+            with stage(f'write_image:{image_format}'):
+                pio.write_image(fig, partial_path, width=self.width, height=self.height, validate=False)
+            os.replace(partial_path, cached_path)
+            self.rendered += 1
+        if os.path.abspath(path) != os.path.abspath(cached_path):
+            shutil.copyfile(cached_path, path)
+        return path
+
+
+def per_node_figure(data, positions, title="FertilityAI User Flow"):
+    # Figure construction as chart_script.py originally did it (one trace per node,
+    # one add_annotation per edge, one trace per legend entry); benchmark baseline
+    fig = go.Figure()
+    for step_data in data["user_journey"]:
+        step = step_data["step"]
+        x, y = positions[step]
+        config = type_config[step_data["type"]]
+        fig.add_trace(go.Scatter(
+            x=[x], y=[y],
+            mode='markers+text',
+            marker=dict(symbol=config["symbol"], size=config["size"], color=config["color"],
+                        line=dict(width=2, color='white')),
+            text=[display_name(step)],
+            textposition="middle center",
+            textfont=dict(size=11, color='white', family="Arial Black"),
+            hovertemplate=f"<b>{step}</b><br>{step_data['description']}<extra></extra>",
+            showlegend=False,
+            name=""
+        ))
+    for annotation in chart_script.edge_annotations(data["interactions"], positions):
+        fig.add_annotation(**annotation)
+    for i, (label, color) in enumerate(chart_script.legend_items):
+        fig.add_trace(go.Scatter(
+            x=[-8], y=[9 - i*0.8],
+            mode='markers+text',
+            marker=dict(size=18, color=color, symbol='square'),
+            text=[label],
+            textposition="middle right",
+            textfont=dict(size=11),
+            showlegend=False,
+            hoverinfo='skip',
+            name=""
+        ))
+    fig.update_layout(
+        title=title, title_x=0.5,
+        xaxis=dict(range=[-10, 8], showgrid=False, showticklabels=False, zeroline=False, visible=False),
+        yaxis=dict(range=[-1, 11], showgrid=False, showticklabels=False, zeroline=False, visible=False),
+        plot_bgcolor='white', paper_bgcolor='white', showlegend=False
+    )
+    return fig
+
+
+def batch_variants(count):
+    # Per-clinic charts: the same journey with clinic-specific titles and a few
+    # descriptions changed, like a nightly regeneration run
+    variants = []
+    for i in range(count):
+        variant = copy.deepcopy(data)
+        variant["user_journey"][0]["description"] = f"User visits FertilityAI chatbot for clinic {i % 25}"
+        variants.append((f"FertilityAI User Flow - Clinic {i % 25}", variant))
+    return variants
+
+
+def benchmark(count, out_dir, render=True):
+    variants = batch_variants(count)
+    os.makedirs(out_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    for i, (title, variant) in enumerate(variants):
+        fig = per_node_figure(variant, positions, title)
+        if render:
+            fig.write_image(os.path.join(out_dir, f'baseline_{i}.png'), width=1200, height=800)
+        else:
+            fig.to_dict()
+    baseline = time.perf_counter() - started
+    print(f"current script path: {count} charts in {baseline:.2f}s ({baseline / count * 1000:.1f} ms/chart)")
+
+    if not render:
+        started = time.perf_counter()
+        for title, variant in variants:
+            build_figure(variant, positions, title).to_dict()
+        elapsed = time.perf_counter() - started
+        print(f"merged-trace figures: {count} charts in {elapsed:.2f}s ({elapsed / count * 1000:.1f} ms/chart)")
+        return
+
+    cache_dir = os.path.join(out_dir, 'cache')
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    with ChartService(cache_dir) as service:
+        for attempt in ('cold cache', 'warm cache'):
+            started = time.perf_counter()
+            for i, (title, variant) in enumerate(variants):
+                service.render(variant, positions, os.path.join(out_dir, f'service_{i}.png'), title)
+            elapsed = time.perf_counter() - started
+            print(f"chart service ({attempt}): {count} charts in {elapsed:.2f}s "
+                  f"({elapsed / count * 1000:.1f} ms/chart), {service.rendered} rendered, {service.cached} from cache")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render flowcharts through the cached chart service")
+    parser.add_argument('--benchmark', type=int, metavar='CHARTS', help="compare CHARTS charts with the original script path")
+    parser.add_argument('--no-render', action='store_true', help="benchmark figure construction only (no Kaleido/Chrome)")
+    parser.add_argument('--out', default=os.path.join(BASE_DIR, '.chart_benchmark'), help="output directory for --benchmark")
+    add_graph_arguments(parser)
+    args = parser.parse_args(argv)
+    graph = graph_from_args(parser, args)
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.out, render=not args.no_render)
+        return 0
+    with ChartService() as service:
+        service.render(graph, graph_positions(graph, args.auto_layout), os.path.join(BASE_DIR, 'fertility_ai_flowchart.png'))
+    print(f"{service.rendered} rendered, {service.cached} from cache")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
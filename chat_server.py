@@ -0,0 +1,353 @@
+# Local asyncio chat backend for the FertilityAI frontend.
+# Serves index.html/app.js/style.css and answers chat turns over keep-alive HTTP
+# (POST /api/chat) or a WebSocket (/ws). Uses only the standard library so it runs
+# anywhere script.py does.
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from collections import OrderedDict, deque
+
+from intent_classifier import IntentClassifier, chat_intents
+from response_catalog import BUNDLE_DIR, DEFAULT_RESPONSES, response_table
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_FILES = {
+    '/': ('index.html', 'text/html; charset=utf-8'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8'),
+    '/app.js': ('app.js', 'application/javascript; charset=utf-8'),
+    '/style.css': ('style.css', 'text/css; charset=utf-8'),
+}
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC11B65'
+MAX_BODY_BYTES = 64 * 1024
+
+class TTLCache:
+    # LRU cache whose entries also expire ttl seconds after they were stored
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SessionStore:
+    # Per-session context (language and recent intents), least recently used
+    # sessions are evicted once max_sessions is reached
+
+    def __init__(self, max_sessions=10000, history=10):
+        self.max_sessions = max_sessions
+        self.history = history
+        self.evicted = 0
+        self._sessions = OrderedDict()
+
+    def get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {'language': 'en', 'turns': 0, 'intents': deque(maxlen=self.history)}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class ChatBackend:
+
+    def __init__(self, classifier=None, cache=None, sessions=None, responses=None):
+        # intent_recognition plus the success/timeline/greeting intents the
+        # frontend has answers for
+        self.classifier = classifier or IntentClassifier(chat_intents())
+        self.cache = cache or TTLCache()
+        self.sessions = sessions or SessionStore()
+        # {(intent, language): message}, see response_catalog.response_table
+        self.responses = responses or response_table()
+
+    def reply(self, session_id, message, language=None):
+        # Returns the encoded JSON reply for one chat turn
+        session = self.sessions.get(session_id)
+        if language:
+            session['language'] = language
+        language = session['language']
+        session['turns'] += 1
+
+        intent = self.classifier.classify(message)
+        # Follow-ups without a recognisable intent stay on the previous topic
+        if intent is None and session['intents']:
+            intent = session['intents'][-1]
+        if intent is None:
+            defaults = DEFAULT_RESPONSES.get(language, DEFAULT_RESPONSES['en'])
+            message = defaults[(session['turns'] - 1) % len(defaults)]
+            return json.dumps({"intent": None, "language": language, "message": message}).encode()
+        if intent != 'greeting':
+            # A greeting is not a topic to follow up on
+            session['intents'].append(intent)
+
+        key = (intent, language)
+        body = self.cache.get(key)
+        if body is None:
+            message = self.responses.get(key) or self.responses[intent, 'en']
+            body = json.dumps({"intent": intent, "language": language, "message": message}).encode()
+            self.cache.put(key, body)
+        return body
+
+    def reply_json(self, payload):
+        # ValueError/AttributeError mark a malformed request (answered with a 400)
+        request = json.loads(payload)
+        language = request.get('language')
+        if language is not None and not isinstance(language, str):
+            raise ValueError("language must be a string")
+        return self.reply(str(request.get('session_id', '')), str(request.get('message', '')), language)
+
+
+class ChatServer:
+
+    def __init__(self, backend=None, static_dir=BASE_DIR, bundle_dir=BUNDLE_DIR):
+        self.backend = backend or ChatBackend()
+        self.static_dir = static_dir
+        self.bundle_dir = bundle_dir
+        self._static = {}
+        self._bundles = {}
+
+    def static_file(self, path):
+        # Static files are read once and kept in memory
+        if path not in self._static:
+            name, content_type = STATIC_FILES[path]
+            with open(os.path.join(self.static_dir, name), 'rb') as f:
+                self._static[path] = (f.read(), content_type)
+        return self._static[path]
+
+    def bundles(self):
+        # Hashed response bundles from response_catalog.py by URL path; only names
+        # listed in the bundle manifest are served
+        if not self._bundles:
+            with open(os.path.join(self.bundle_dir, 'manifest.json'), encoding='utf-8') as f:
+                for bundle in json.load(f).values():
+                    with open(os.path.join(self.bundle_dir, os.path.basename(bundle)), 'rb') as bundle_file:
+                        self._bundles['/' + bundle] = bundle_file.read()
+        return self._bundles
+
+    async def handle(self, reader, writer):
+        # One connection; requests are served in a loop until the client closes
+        # it or asks for Connection: close
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                if path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self.handle_websocket(reader, writer, headers)
+                    break
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, b'{"error": "request too large"}', close=True)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+                if method == 'POST' and path == '/api/chat':
+                    try:
+                        await self.respond(writer, 200, self.backend.reply_json(body), keep_alive=keep_alive)
+                    except (ValueError, AttributeError):
+                        await self.respond(writer, 400, b'{"error": "invalid chat request"}', keep_alive=keep_alive)
+                elif method == 'GET' and path in STATIC_FILES:
+                    content, content_type = self.static_file(path)
+                    await self.respond(writer, 200, content, content_type, keep_alive)
+                elif method == 'GET' and path.startswith('/locales/') and path in self.bundles():
+                    # Content-hashed names never change content, so they can be cached for good
+                    await self.respond(writer, 200, self._bundles[path], 'application/json; charset=utf-8', keep_alive,
+                                       cache_control='public, max-age=31536000, immutable')
+                else:
+                    await self.respond(writer, 404, b'{"error": "not found"}', keep_alive=keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, body, content_type='application/json', keep_alive=True, close=False,
+                      cache_control=None):
+        reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large'}[status]
+        connection = 'keep-alive' if keep_alive and not close else 'close'
+        cache_header = f'Cache-Control: {cache_control}\r\n' if cache_control else ''
+        writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n{cache_header}'
+                     f'Content-Length: {len(body)}\r\nConnection: {connection}\r\n\r\n'.encode('latin-1') + body)
+        await writer.drain()
+
+    async def handle_websocket(self, reader, writer, headers):
+        # Minimal RFC 6455 server: text frames carry the same JSON as /api/chat
+        if 'sec-websocket-key' not in headers:
+            await self.respond(writer, 400, b'{"error": "missing Sec-WebSocket-Key"}', close=True)
+            return
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WEBSOCKET_GUID).encode()).digest())
+        writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                     b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        await writer.drain()
+        while True:
+            opcode, payload = await read_frame(reader)
+            if opcode == 0x8:
+                writer.write(encode_frame(0x8, payload[:2]))
+                await writer.drain()
+                break
+            if opcode == 0x9:
+                writer.write(encode_frame(0xA, payload))
+            elif opcode == 0x1:
+                try:
+                    writer.write(encode_frame(0x1, self.backend.reply_json(payload)))
+                except (ValueError, AttributeError):
+                    writer.write(encode_frame(0x1, b'{"error": "invalid chat request"}'))
+            await writer.drain()
+
+
+async def read_frame(reader):
+    first, second = await reader.readexactly(2)
+    opcode = first & 0x0F
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack('!H', await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack('!Q', await reader.readexactly(8))
+    if length > MAX_BODY_BYTES:
+        raise ValueError('websocket frame too large')
+    mask = await reader.readexactly(4) if second & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+
+def encode_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def serve(host, port, backend=None):
+    server = ChatServer(backend)
+    return await asyncio.start_server(server.handle, host, port, backlog=4096)
+
+
+async def load_test(sessions, turns, connections, host='127.0.0.1', port=0):
+    # Runs a server in this process and drives it with keep-alive clients, each
+    # connection interleaving the turns of its share of the sessions
+    backend = ChatBackend()
+    server = await serve(host, port, backend)
+    port = server.sockets[0].getsockname()[1]
+    messages = ["Hi, how much does IVF cost?", "What are the success rates at 35?", "Can I book an appointment?",
+                "I'm feeling anxious about this", "Please look at my hormone test results", "tell me more"]
+    latencies = []
+
+    async def client(index):
+        reader, writer = await asyncio.open_connection(host, port)
+        owned = range(index, sessions, connections)
+        for turn in range(turns):
+            for session in owned:
+                body = json.dumps({"session_id": f"load-{session}", "message": messages[(session + turn) % len(messages)],
+                                   "language": "en"}).encode()
+                started = time.perf_counter()
+                writer.write(b'POST /api/chat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: ' + str(len(body)).encode() + b'\r\n\r\n' + body)
+                await writer.drain()
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line == b'\r\n':
+                        break
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - started)
+        writer.close()
+
+    started = time.perf_counter()
+    async with server:
+        await asyncio.gather(*(client(i) for i in range(min(connections, sessions))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(f"{len(latencies):,} turns from {sessions:,} sessions over {connections:,} connections in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f} turns/s)")
+    print(f"latency p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"cache hits {backend.cache.hits:,}, misses {backend.cache.misses:,}; "
+          f"sessions held {len(backend.sessions):,}, evicted {backend.sessions.evicted:,}")
+    return p50, p99
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the FertilityAI chat frontend and API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--load-test', action='store_true', help="run the local load test instead of serving")
+    parser.add_argument('--sessions', type=int, default=5000, help="concurrent sessions for --load-test")
+    parser.add_argument('--turns', type=int, default=4, help="turns per session for --load-test")
+    parser.add_argument('--connections', type=int, default=500, help="client connections for --load-test")
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        asyncio.run(load_test(args.sessions, args.turns, args.connections))
+        return 0
+
+    async def run():
+        server = await serve(args.host, args.port)
+        print(f"FertilityAI chat backend on http://{args.host}:{args.port}/")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
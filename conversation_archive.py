@@ -0,0 +1,387 @@
+# Compact columnar archive for conversation logs.
+# One file holds every turn as fixed-width columns: dictionary-encoded roles,
+# features, session types, stages and conversation names, int64 epoch timestamps,
+# and all messages in one shared UTF-8 buffer addressed by offsets. The reader
+# memory-maps the file and exposes the columns as NumPy views without copying,
+# in the layout metrics_engine.compute_patterns expects.
+#
+# File layout (little-endian):
+#   b'FAIARCH1' | uint64 header length | JSON header | 8-byte aligned column data
+# The header lists the dictionaries and, per column, its dtype, offset and count.
+import argparse
+import json
+import mmap
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from metrics_engine import EPOCH, epoch_seconds
+from script import read_log
+
+MAGIC = b'FAIARCH1'
+VERSION = 1
+DICTIONARIES = ('conversation', 'session_type', 'stage', 'role', 'feature')
+
+# Per-turn flags, so absent keys round-trip as absent rather than empty
+HAS_FEATURES = 1
+HAS_MESSAGE = 2
+
+
+def json_records(path):
+    # conversation_examples.json ({conversation: [turns]}) as log records
+    with open(path, encoding='utf-8') as f:
+        examples = json.load(f)
+    for name, turns in examples.items():
+        for turn in turns:
+            yield {"conversation": name, **turn}
+
+
+class ArchiveWriter:
+    # Builds an archive from log records one at a time. Numeric columns are kept in
+    # compact arrays and message text is spilled to a temporary file, so memory
+    # grows by a few bytes per turn rather than by the size of the log.
+
+    def __init__(self, path):
+        self.path = path
+        self.codes = {name: {} for name in DICTIONARIES}
+        self.sessions = {}
+        self.columns = {
+            'session': array('i'),
+            'conversation': array('i'),
+            'session_type': array('i'),
+            'stage': array('i'),
+            'role': array('i'),
+            'flags': array('B'),
+            'timestamp': array('q'),
+            'rating': array('d'),
+            'message.offsets': array('q', [0]),
+            'features.offsets': array('q', [0]),
+            'features.codes': array('i'),
+        }
+        self._session_text = bytearray()
+        self._session_offsets = array('q', [0])
+        self._messages = tempfile.TemporaryFile()
+        self._message_bytes = 0
+
+    def code(self, dictionary, value):
+        if value is None:
+            return -1
+        codes = self.codes[dictionary]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+        return code
+
+    def add(self, record):
+        columns = self.columns
+        session_id = record.get('session_id')
+        if session_id is None:
+            session = -1
+        else:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = len(self.sessions)
+                self._session_text += str(session_id).encode('utf-8')
+                self._session_offsets.append(len(self._session_text))
+        columns['session'].append(session)
+        for name in ('conversation', 'session_type', 'stage', 'role'):
+            columns[name].append(self.code(name, record.get(name)))
+
+        columns['timestamp'].append(epoch_seconds(record['timestamp']))
+        rating = record.get('rating')
+        columns['rating'].append(float('nan') if rating is None else rating)
+
+        flags = 0
+        if 'message' in record:
+            flags |= HAS_MESSAGE
+            message = record['message'].encode('utf-8')
+            self._messages.write(message)
+            self._message_bytes += len(message)
+        columns['message.offsets'].append(self._message_bytes)
+        if 'features' in record:
+            flags |= HAS_FEATURES
+            for tag in record['features']:
+                columns['features.codes'].append(self.code('feature', tag))
+        columns['features.offsets'].append(len(columns['features.codes']))
+        columns['flags'].append(flags)
+
+    def close(self):
+        sections = [(name, np.frombuffer(values, dtype=values.typecode)) for name, values in self.columns.items()]
+        sections.append(('session_ids.offsets', np.frombuffer(self._session_offsets, dtype='q')))
+        sections.append(('session_ids.data', np.frombuffer(bytes(self._session_text), dtype=np.uint8)))
+
+        header = {
+            "version": VERSION,
+            "turns": len(self.columns['session']),
+            "dictionaries": {name: list(codes) for name, codes in self.codes.items()},
+            "columns": {},
+        }
+        # Offsets depend on the header size, which depends on the offsets; lay the
+        # sections out against a generous header size estimate until it fits
+        reserved = 4096
+        while True:
+            offset = align(len(MAGIC) + 8 + reserved)
+            for name, values in sections:
+                header['columns'][name] = {"dtype": values.dtype.str, "offset": offset, "count": len(values)}
+                offset = align(offset + values.nbytes)
+            header['columns']['message.data'] = {"dtype": "|u1", "offset": offset, "count": self._message_bytes}
+            encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+            if len(encoded) <= reserved:
+                break
+            reserved = len(encoded) * 2
+
+        with open(self.path, 'wb') as out:
+            out.write(MAGIC)
+            out.write(np.uint64(reserved).tobytes())
+            out.write(encoded.ljust(reserved))
+            for name, values in sections:
+                out.seek(header['columns'][name]['offset'])
+                out.write(values.tobytes())
+            out.seek(header['columns']['message.data']['offset'])
+            self._messages.seek(0)
+            while True:
+                chunk = self._messages.read(1 << 20)
+                if not chunk:
+                    break
+                out.write(chunk)
+        self._messages.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._messages.close()
+
+
+def align(offset):
+    return (offset + 7) & ~7
+
+
+def convert(records, path):
+    with ArchiveWriter(path) as writer:
+        for record in records:
+            writer.add(record)
+    return path
+
+
+class ConversationArchive:
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a conversation archive")
+        length = int(np.frombuffer(self._map, dtype='<u8', count=1, offset=len(MAGIC))[0])
+        header = json.loads(bytes(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + length]).rstrip(b' '))
+        if header['version'] != VERSION:
+            raise ValueError(f"unsupported archive version {header['version']}")
+        self.turns = header['turns']
+        self.dictionaries = header['dictionaries']
+        # Zero-copy views into the mapped file
+        self.columns = {
+            name: np.frombuffer(self._map, dtype=spec['dtype'], count=spec['count'], offset=spec['offset'])
+            for name, spec in header['columns'].items()
+        }
+
+    def __len__(self):
+        return self.turns
+
+    def close(self):
+        # Columns handed out earlier (including metric_columns() views) keep the
+        # mapping alive; if any are still referenced the unmap is left to the
+        # garbage collector once the last of them goes away. Closing twice is fine.
+        if self._map is None:
+            return
+        self.columns = {}
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def categorical(self, name):
+        return pd.Categorical.from_codes(self.columns[name], self.dictionaries[name])
+
+    def session_ids(self):
+        offsets = self.columns['session_ids.offsets']
+        data = self.columns['session_ids.data']
+        return [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in range(len(offsets) - 1)]
+
+    def message(self, i):
+        offsets = self.columns['message.offsets']
+        return bytes(self.columns['message.data'][offsets[i]:offsets[i + 1]]).decode('utf-8')
+
+    def conversation_rows(self):
+        # Indices of the turns that belong to a named example conversation
+        return np.flatnonzero(self.columns['conversation'] >= 0).tolist()
+
+    def metric_columns(self):
+        # Columns for metrics_engine.compute_patterns. Session ids stay integer codes
+        # and strings stay dictionary codes; only turns without a session are
+        # filtered out (a copy is made only if there are any).
+        session = self.columns['session']
+        feature_offsets = self.columns['features.offsets']
+        feature_turn = np.repeat(np.arange(self.turns, dtype=np.int64), np.diff(feature_offsets))
+        feature_codes = self.columns['features.codes']
+
+        keep = session >= 0
+        columns = {
+            'session_id': session,
+            'session_type': self.categorical('session_type'),
+            'stage': self.categorical('stage'),
+            'role': self.categorical('role'),
+            'timestamp': self.columns['timestamp'],
+            'rating': self.columns['rating'],
+        }
+        if not keep.all():
+            columns = {name: values[keep] for name, values in columns.items()}
+            turn_index = np.cumsum(keep) - 1
+            kept_features = keep[feature_turn]
+            feature_turn = turn_index[feature_turn[kept_features]]
+            feature_codes = feature_codes[kept_features]
+        columns['feature'] = pd.Categorical.from_codes(feature_codes, self.dictionaries['feature'])
+        columns['feature_turn'] = feature_turn
+        return columns
+
+    def records(self, rows=None):
+        # Log records in the script.py JSONL format, decoded lazily one at a time;
+        # rows restricts the output to those turn indices
+        columns = self.columns
+        names = {name: self.dictionaries[name] for name in DICTIONARIES}
+        session_ids = self.session_ids()
+        message_offsets = columns['message.offsets'].tolist()
+        feature_offsets = columns['features.offsets'].tolist()
+        feature_codes = columns['features.codes']
+        message_data = columns['message.data']
+        for i in (range(self.turns) if rows is None else rows):
+            record = {}
+            session = int(columns['session'][i])
+            if session >= 0:
+                record['session_id'] = session_ids[session]
+            for name in ('session_type', 'stage', 'conversation', 'role'):
+                code = int(columns[name][i])
+                if code >= 0:
+                    record[name] = names[name][code]
+            flags = int(columns['flags'][i])
+            if flags & HAS_MESSAGE:
+                record['message'] = bytes(message_data[message_offsets[i]:message_offsets[i + 1]]).decode('utf-8')
+            record['timestamp'] = str(EPOCH + timedelta(seconds=int(columns['timestamp'][i])))
+            if flags & HAS_FEATURES:
+                record['features'] = [names['feature'][code] for code in
+                                      feature_codes[feature_offsets[i]:feature_offsets[i + 1]].tolist()]
+            rating = float(columns['rating'][i])
+            if rating == rating:
+                record['rating'] = rating
+            yield record
+
+
+def synthetic_examples(path, turns, seed=0):
+    # A conversation_examples.json-style file with `turns` turns, built by
+    # repeating the bundled examples
+    from script import conversation_examples
+
+    flat = [turn for example in conversation_examples.values() for turn in example]
+    per_conversation = 50
+    examples = {}
+    for i in range(0, turns, per_conversation):
+        examples[f"conversation_{i // per_conversation}"] = [
+            flat[(i + j + seed) % len(flat)] for j in range(min(per_conversation, turns - i))]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(examples, f, ensure_ascii=False, indent=2)
+
+
+def peak_rss_mib():
+    # VmHWM is reset by exec, unlike ru_maxrss, which a child started from a large
+    # parent inherits
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(kind, path):
+    # Runs in a fresh process: load time, a full pass over roles, and peak RSS
+    started = time.perf_counter()
+    if kind == 'json':
+        with open(path, encoding='utf-8') as f:
+            examples = json.load(f)
+        loaded = time.perf_counter() - started
+        roles = {}
+        for turns in examples.values():
+            for turn in turns:
+                roles[turn['role']] = roles.get(turn['role'], 0) + 1
+    else:
+        archive = ConversationArchive(path)
+        loaded = time.perf_counter() - started
+        codes = np.bincount(archive.columns['role'] + 1)
+        roles = dict(zip([None] + archive.dictionaries['role'], codes.tolist()))
+    scanned = time.perf_counter() - started
+    print(json.dumps({"load": loaded, "scan": scanned, "peak_rss_mib": peak_rss_mib(), "roles": roles}))
+
+
+def benchmark(turns):
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, 'conversations.json')
+        archive_path = os.path.join(tmp, 'conversations.faiarch')
+        synthetic_examples(json_path, turns)
+
+        started = time.perf_counter()
+        convert(json_records(json_path), archive_path)
+        print(f"{turns:,} turns: converted in {time.perf_counter() - started:.2f}s; "
+              f"JSON {os.path.getsize(json_path) / 2**20:.1f} MiB, archive {os.path.getsize(archive_path) / 2**20:.1f} MiB")
+
+        for kind, path in (('json', json_path), ('archive', archive_path)):
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', kind, path],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            label = 'json.load' if kind == 'json' else 'mmap archive'
+            print(f"  {label:<12} load {result['load'] * 1000:9.1f} ms, load + role scan {result['scan'] * 1000:9.1f} ms, "
+                  f"peak RSS {result['peak_rss_mib']:.0f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert conversation logs to the columnar archive format")
+    parser.add_argument('source', nargs='?', help="conversation_examples.json-style file or JSONL log")
+    parser.add_argument('archive', nargs='?', help="archive file to write")
+    parser.add_argument('--benchmark', type=int, metavar='TURNS', help="compare load time and RSS against json.load")
+    parser.add_argument('--measure', nargs=2, metavar=('KIND', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        measure(*args.measure)
+        return 0
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return 0
+    if not args.source or not args.archive:
+        parser.error("source and archive are required")
+    records = read_log([args.source]) if args.source.endswith('.jsonl') else json_records(args.source)
+    convert(records, args.archive)
+    with ConversationArchive(args.archive) as archive:
+        print(f"{len(archive):,} turns written to {args.archive} ({os.path.getsize(args.archive) / 2**20:.2f} MiB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# Batch IVF cost estimation, vectorized over scenarios.
+# Mirrors updateCostCalculation in app.js: basic cycle and medications are paid
+# per cycle, ICSI/PGT/frozen transfer are one-off add-ons. Price tables use the
+# same shape as appData.costFactors, so regional or per-clinic tables can be
+# priced side by side.
+import argparse
+import itertools
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+APP_JS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.js')
+
+# appData.costFactors (--check compares the two)
+COST_FACTORS = [
+    {"factor": "Basic IVF Cycle", "range": [12000, 15000]},
+    {"factor": "Medications", "range": [3000, 5000]},
+    {"factor": "ICSI (if needed)", "range": [1500, 2500]},
+    {"factor": "PGT Testing", "range": [3000, 6000]},
+    {"factor": "Frozen Transfer", "range": [3000, 5000]},
+]
+FACTOR_NAMES = [row["factor"] for row in COST_FACTORS]
+ADD_ONS = ('icsi', 'pgt', 'frozen')
+
+
+def price_matrix(tables):
+    # {name: costFactors list} -> (names, int64 array of shape (tables, factors, 2)).
+    # Prices are whole currency units, as in appData.costFactors; fractional ones
+    # are rejected rather than truncated.
+    names = list(tables)
+    matrix = np.zeros((len(names), len(FACTOR_NAMES), 2), dtype=np.int64)
+    for i, name in enumerate(names):
+        ranges = {row["factor"]: row["range"] for row in tables[name]}
+        missing = [factor for factor in FACTOR_NAMES if factor not in ranges]
+        if missing:
+            raise ValueError(f"price table {name!r} is missing {', '.join(missing)}")
+        fractional = [factor for factor in FACTOR_NAMES if any(price != int(price) for price in ranges[factor])]
+        if fractional:
+            raise ValueError(f"price table {name!r} has non-integer prices for {', '.join(fractional)}")
+        matrix[i] = [ranges[factor] for factor in FACTOR_NAMES]
+    return names, matrix
+
+
+def estimate(cycles, icsi, pgt, frozen, matrix, table=None):
+    # Min/max totals for arrays of scenarios in one pass; table holds the index of
+    # each scenario's price table (defaults to the first)
+    cycles = np.asarray(cycles, dtype=np.int64)
+    table = np.zeros(len(cycles), dtype=np.intp) if table is None else np.asarray(table, dtype=np.intp)
+
+    # Price every add-on combination per table up front, so each scenario costs
+    # two small gathers instead of one per factor
+    per_cycle = matrix[:, 0] + matrix[:, 1]                         # (tables, 2)
+    bits = np.array(list(itertools.product((0, 1), repeat=len(ADD_ONS))))[:, ::-1]
+    add_ons = np.einsum('ca,tar->tcr', bits, matrix[:, 2:])         # (tables, combos, 2)
+    combo = (np.asarray(icsi, dtype=np.intp) | np.asarray(pgt, dtype=np.intp) << 1
+             | np.asarray(frozen, dtype=np.intp) << 2)
+
+    min_total = per_cycle[table, 0] * cycles + add_ons[table, combo, 0]
+    max_total = per_cycle[table, 1] * cycles + add_ons[table, combo, 1]
+    return min_total, max_total
+
+
+def scenario_grid(tables, cycles=range(1, 7)):
+    # Every table x cycle count x add-on combination, as a columnar DataFrame
+    names, matrix = price_matrix(tables)
+    combos = np.array(list(itertools.product((False, True), repeat=len(ADD_ONS))))
+    cycles = np.asarray(list(cycles), dtype=np.int64)
+
+    table = np.repeat(np.arange(len(names)), len(cycles) * len(combos))
+    cycle_column = np.tile(np.repeat(cycles, len(combos)), len(names))
+    combo_index = np.tile(np.arange(len(combos)), len(names) * len(cycles))
+    add_ons = {name: combos[combo_index, i] for i, name in enumerate(ADD_ONS)}
+
+    min_total, max_total = estimate(cycle_column, add_ons['icsi'], add_ons['pgt'], add_ons['frozen'], matrix, table)
+    return pd.DataFrame({
+        'table': pd.Categorical.from_codes(table, names),
+        'cycles': cycle_column,
+        **add_ons,
+        'min_total': min_total,
+        'max_total': max_total,
+    })
+
+
+def app_js_cost_factors(path=APP_JS):
+    # appData.costFactors from app.js
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    block = re.search(r'costFactors: \[(.*?)\n  \]', source, re.S).group(1)
+    return [{"factor": json.loads(factor), "range": [int(low), int(high)]}
+            for factor, low, high in re.findall(r'\{factor: ("(?:\\.|[^"\\])*"), range: \[(\d+), (\d+)\]\}', block)]
+
+
+def app_js_formula(path=APP_JS):
+    # The prices updateCostCalculation in app.js adds up:
+    # {"per_cycle": ([basic, medication] minimums, [...] maximums), add-on: (min, max)}
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    body = re.search(r'function updateCostCalculation\(\) \{(.*?)\n\}', source, re.S).group(1)
+    formula = {"per_cycle": tuple(
+        [int(price) for price in re.search(rf'let {total} = \((\d+) \+ (\d+)\) \* cycles;', body).groups()]
+        for total in ('minTotal', 'maxTotal'))}
+    for add_on in ADD_ONS:
+        match = re.search(rf'if \({add_on}\) \{{\s*minTotal \+= (\d+);\s*maxTotal \+= (\d+);', body)
+        formula[add_on] = (int(match.group(1)), int(match.group(2)))
+    return formula
+
+
+def js_cost_range(cycles, icsi, pgt, frozen, formula):
+    # Line-for-line port of updateCostCalculation, with the prices app_js_formula
+    # read from it; used for the parity check
+    (basic_min, medication_min), (basic_max, medication_max) = formula["per_cycle"]
+    min_total = (basic_min + medication_min) * cycles
+    max_total = (basic_max + medication_max) * cycles
+    if icsi:
+        min_total += formula["icsi"][0]
+        max_total += formula["icsi"][1]
+    if pgt:
+        min_total += formula["pgt"][0]
+        max_total += formula["pgt"][1]
+    if frozen:
+        min_total += formula["frozen"][0]
+        max_total += formula["frozen"][1]
+    return min_total, max_total
+
+
+def check_parity(path=APP_JS):
+    # Compares COST_FACTORS with appData.costFactors, and the engine priced with
+    # appData.costFactors with updateCostCalculation for every cycles 1-6 x
+    # add-on combination the calculator UI can produce; returns a description of
+    # every difference
+    cost_factors = app_js_cost_factors(path)
+    formula = app_js_formula(path)
+    differences = []
+    if cost_factors != COST_FACTORS:
+        differences.append("COST_FACTORS differs from appData.costFactors")
+    grid = scenario_grid({"app.js": cost_factors})
+    for row in grid.itertuples(index=False):
+        expected = js_cost_range(row.cycles, row.icsi, row.pgt, row.frozen, formula)
+        if (row.min_total, row.max_total) != expected:
+            differences.append(f"cycles={row.cycles} icsi={row.icsi} pgt={row.pgt} frozen={row.frozen}: "
+                               f"costFactors give {row.min_total}-{row.max_total}, "
+                               f"updateCostCalculation {expected[0]}-{expected[1]}")
+    return differences
+
+
+def benchmark(scenarios, tables=64, seed=0):
+    rng = np.random.default_rng(seed)
+    # Synthetic regional tables: the default prices scaled by a per-region factor
+    base = np.array([row["range"] for row in COST_FACTORS], dtype=np.float64)
+    matrix = np.rint(base[None] * rng.uniform(0.6, 1.6, (tables, 1, 1))).astype(np.int64)
+    cycles = rng.integers(1, 7, scenarios)
+    icsi, pgt, frozen = rng.random((3, scenarios)) < 0.5
+    table = rng.integers(0, tables, scenarios)
+
+    started = time.perf_counter()
+    estimate(cycles, icsi, pgt, frozen, matrix, table)
+    elapsed = time.perf_counter() - started
+    print(f"vectorized: {scenarios:,} scenarios over {tables} price tables in {elapsed:.3f}s "
+          f"({scenarios / elapsed:,.0f} scenarios/s)")
+
+    count = min(scenarios, 200_000)
+    formula = app_js_formula()
+    started = time.perf_counter()
+    for i in range(count):
+        js_cost_range(int(cycles[i]), icsi[i], pgt[i], frozen[i], formula)
+    elapsed = time.perf_counter() - started
+    print(f"per-scenario loop: {count:,} scenarios in {elapsed:.3f}s ({count / elapsed:,.0f} scenarios/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price IVF cost scenarios for one or more price tables")
+    parser.add_argument('--tables', help="JSON file mapping table name (region/clinic) to a costFactors list")
+    parser.add_argument('--out', help="write the scenario grid to this CSV file")
+    parser.add_argument('--check', action='store_true', help="check parity with costFactors and the formula in app.js")
+    parser.add_argument('--benchmark', type=int, metavar='SCENARIOS', help="measure throughput on random scenarios")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        differences = check_parity()
+        for difference in differences:
+            print(f"MISMATCH {difference}")
+        print("Cost engine matches updateCostCalculation" if not differences else f"{len(differences)} differences")
+        return 1 if differences else 0
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return 0
+
+    tables = {"default": COST_FACTORS}
+    if args.tables:
+        with open(args.tables, encoding='utf-8') as f:
+            tables = json.load(f)
+    grid = scenario_grid(tables)
+    if args.out:
+        grid.to_csv(args.out, index=False)
+        print(f"{len(grid):,} scenarios written to {args.out}")
+    else:
+        print(grid.to_string(index=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# Stage timers, peak-memory tracking and optional cProfile capture for the
+# analytics scripts. Code marks its hot paths with `with stage('name'):`, which
+# costs nothing unless a Profiler is active. The profiler writes a JSON report
+# next to the generated files and can compare it with a stored baseline so CI can
+# flag slowdowns.
+#
+# Enabled by --profile / --cprofile on script.py and chart_script.py, or by the
+# FERTILITYAI_PROFILE environment variable ("1" for timers and memory, "cprofile"
+# to add a cProfile capture).
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PROFILE_ENV = 'FERTILITYAI_PROFILE'
+
+# Changes smaller than these are noise on any machine and never count as regressions
+MIN_SECONDS = 0.005
+MIN_BYTES = 1 << 20
+
+_active = None
+
+
+class Profiler:
+
+    def __init__(self, name, out_dir='.', memory=True, cprofile=False):
+        self.name = name
+        self.out_dir = out_dir
+        self.memory = memory
+        self.cprofile = cprofile
+        self.stages = {}
+        self._stack = []   # [name, started, peak seen by nested stages]
+        self._profile = None
+        self._tracing = False   # whether this profiler started tracemalloc
+        self._started = None
+        self._elapsed = 0.0
+        self._peak = 0
+
+    def __enter__(self):
+        global _active
+        self._tracing = self.memory and not tracemalloc.is_tracing()
+        if self._tracing:
+            tracemalloc.start()
+        if self.cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._previous, _active = _active, self
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self._elapsed = time.perf_counter() - self._started
+        _active = self._previous
+        if self._profile is not None:
+            self._profile.disable()
+        if self.memory:
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        # Tracing someone else started (an outer profiler, python -X tracemalloc)
+        # is left running
+        if self._tracing:
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name):
+        # Peak memory is tracked per stage with tracemalloc.reset_peak; a nested
+        # stage hands its peak back to the enclosing one before resetting it
+        if self.memory:
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1][2] = max(self._stack[-1][2], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        frame = [name, time.perf_counter(), 0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - frame[1]
+            self._stack.pop()
+            entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += elapsed
+            entry["calls"] += 1
+            if self.memory:
+                peak = max(frame[2], tracemalloc.get_traced_memory()[1])
+                entry["peak_bytes"] = max(entry.get("peak_bytes", 0), peak)
+                self._peak = max(self._peak, peak)
+                if self._stack:
+                    self._stack[-1][2] = max(self._stack[-1][2], peak)
+
+    def report(self, top=25):
+        report = {
+            "script": self.name,
+            "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "memory_tracking": self.memory,
+            "cprofile": self._profile is not None,
+            "total_seconds": self._elapsed,
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+        }
+        if self.memory:
+            report["peak_memory_bytes"] = self._peak
+        if self._profile is not None:
+            report["profile"] = os.path.basename(self.profile_path())
+            report["hot_functions"] = hot_functions(self._profile, top)
+        return report
+
+    def report_path(self):
+        return os.path.join(self.out_dir, f'{self.name}_profile.json')
+
+    def profile_path(self):
+        return os.path.join(self.out_dir, f'{self.name}_profile.pstats')
+
+    def write(self):
+        # Writes the JSON report (and the raw cProfile stats, if captured)
+        os.makedirs(self.out_dir, exist_ok=True)
+        report = self.report()
+        if self._profile is not None:
+            self._profile.dump_stats(self.profile_path())
+        with open(self.report_path(), 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+@contextmanager
+def stage(name):
+    # Times a block under the active profiler; a no-op when none is running
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name):
+            yield
+
+
+def hot_functions(profile, top):
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({"function": f"{os.path.basename(filename)}:{line}({function})", "calls": calls,
+                     "own_seconds": own, "cumulative_seconds": cumulative})
+    rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+    return rows[:top]
+
+
+def regressions(report, baseline, tolerance=0.25):
+    # Stages (and the whole run) that got slower or used more memory than the
+    # baseline by more than tolerance; stages missing from either side are skipped
+    found = []
+
+    def check(label, current, previous, unit, floor):
+        if current is None or previous is None:
+            return
+        if current > previous * (1 + tolerance) and current - previous > floor:
+            change = f"+{(current / previous - 1) * 100:.0f}%" if previous else "was 0"
+            if unit == 's':
+                found.append(f"{label}: {previous:.3f}s -> {current:.3f}s ({change})")
+            else:
+                found.append(f"{label}: {previous / 2**20:.1f} MiB -> {current / 2**20:.1f} MiB ({change})")
+
+    check("total", report["total_seconds"], baseline["total_seconds"], 's', MIN_SECONDS)
+    check("total peak memory", report.get("peak_memory_bytes"), baseline.get("peak_memory_bytes"), 'B', MIN_BYTES)
+    for name, entry in report["stages"].items():
+        previous = baseline["stages"].get(name)
+        if previous is None:
+            continue
+        check(name, entry["seconds"], previous["seconds"], 's', MIN_SECONDS)
+        check(f"{name} peak memory", entry.get("peak_bytes"), previous.get("peak_bytes"), 'B', MIN_BYTES)
+    return found
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true',
+                       help=f"write a stage timing/memory report next to the outputs (or set {PROFILE_ENV}=1)")
+    group.add_argument('--cprofile', action='store_true',
+                       help=f"also capture cProfile stats (or set {PROFILE_ENV}=cprofile)")
+    group.add_argument('--baseline', metavar='JSON', help="fail if stages regressed against this stored report")
+    group.add_argument('--save-baseline', metavar='JSON', help="store this run's report as a baseline")
+    group.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown for --baseline (default 0.25)")
+
+
+def profiler_from_args(name, args, out_dir='.'):
+    # A Profiler when any profiling option or the environment variable asks for
+    # one, else None
+    mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+    cprofile = args.cprofile or mode == 'cprofile'
+    if not (args.profile or cprofile or args.baseline or args.save_baseline or mode not in ('', '0')):
+        return None
+    return Profiler(name, out_dir, cprofile=cprofile)
+
+
+def finish(profiler, args):
+    # Writes the report, stores/compares baselines and returns the exit status
+    report = profiler.write()
+    print(f"\nProfile: {profiler.report_path()} ({report['total_seconds']:.3f}s"
+          + (f", peak {report['peak_memory_bytes'] / 2**20:.1f} MiB traced)" if profiler.memory else ")"))
+    for name, entry in sorted(report["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        memory = f", peak {entry['peak_bytes'] / 2**20:7.1f} MiB" if "peak_bytes" in entry else ""
+        print(f"  {name:<40} {entry['seconds']:8.3f}s x{entry['calls']}{memory}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    if args.baseline:
+        return compare(report, args.baseline, args.tolerance)
+    return 0
+
+
+def compare(report, baseline_path, tolerance=0.25):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    for option in ("memory_tracking", "cprofile"):
+        if baseline.get(option) != report.get(option):
+            print(f"Warning: baseline and report differ in {option}; timings are not comparable")
+    found = regressions(report, baseline, tolerance)
+    for line in found:
+        print(f"REGRESSION {line}")
+    if found:
+        return 1
+    print(f"No regressions against {baseline_path} (tolerance {tolerance:.0%})")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a profile report with a stored baseline")
+    parser.add_argument('report')
+    parser.add_argument('baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    with open(args.report, encoding='utf-8') as f:
+        report = json.load(f)
+    return compare(report, args.baseline, args.tolerance)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
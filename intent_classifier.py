@@ -0,0 +1,366 @@
+# Keyword intent classifier for chat messages.
+# A message is split into words once; single-word keywords are found with a set
+# intersection and phrases with a walk over the words, instead of the chain of
+# includes() checks in generateBotResponse (app.js). Labels of short messages are
+# cached, as the same greetings and questions come up again and again.
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CAPABILITIES_PATH = os.path.join(BASE_DIR, 'advanced_capabilities.json')
+EXAMPLES_PATH = os.path.join(BASE_DIR, 'conversation_examples.json')
+
+# Keywords per intent; only intents listed under intent_recognition in
+# advanced_capabilities.json are compiled. Multi-word phrases score one point per
+# word, so "test results" outweighs a stray "results".
+INTENT_KEYWORDS = {
+    "medical_inquiry": [
+        "ivf", "in vitro", "fertility", "treatment", "side effect", "side effects",
+        "medication", "medications", "embryo", "egg retrieval", "icsi", "pgt",
+        "trying to conceive", "been trying", "fiv", "tratamiento",
+    ],
+    "success_rates": [
+        "success", "success rate", "success rates", "chance", "chances", "odds", "tasas de éxito",
+    ],
+    "treatment_timeline": [
+        "timeline", "how long", "duration", "cronograma",
+    ],
+    "greeting": [
+        "hi", "hello", "hey", "greetings", "hola",
+    ],
+    "cost_question": [
+        "cost", "costs", "price", "pricing", "expensive", "money", "afford", "how much",
+        "insurance", "financing", "costo", "precio",
+    ],
+    "appointment_request": [
+        "appointment", "book", "booking", "schedule", "consultation", "clinic", "clinics",
+        "doctor", "specialist", "cita",
+    ],
+    "emotional_support": [
+        "support", "emotional", "stress", "stressed", "anxious", "anxiety", "scared", "worried",
+        "overwhelmed", "sad", "frustrated", "apoyo",
+    ],
+    "document_analysis": [
+        "upload", "report", "lab report", "results", "test results", "lab results", "hormone",
+        "amh", "fsh", "tsh", "prolactin", "analysis", "analyze", "resultados",
+    ],
+}
+
+# Finer intents the chat backend answers separately (see response_catalog). A
+# classifier built without them folds their keywords into the parent intent, and
+# greetings (no parent) are ignored.
+CHAT_INTENTS = ("success_rates", "treatment_timeline", "greeting")
+PARENT_INTENTS = {"success_rates": "medical_inquiry", "treatment_timeline": "medical_inquiry"}
+
+# Greetings only decide a message that has nothing else in it
+INTENT_WEIGHTS = {"greeting": 0.25}
+
+# Words that say a message is about IVF at all but not what about; they score
+# half, so "IVF cost" is a cost question rather than a medical inquiry
+GENERIC_KEYWORDS = {"ivf", "in vitro", "fertility", "treatment", "fiv", "tratamiento"}
+GENERIC_WEIGHT = 0.5
+
+# Expected labels for the user turns in conversation_examples.json, plus
+# messages that used to be mislabeled
+EXAMPLE_INTENTS = {
+    "Hi, I'm interested in learning about IVF": "medical_inquiry",
+    "Sure, what do you need to know?": None,
+    "I'm 32, we've been trying for 18 months, and I had some blood tests done recently": "medical_inquiry",
+    "I'd like to upload my hormone test results for analysis": "document_analysis",
+    "Can you switch to Spanish? My husband speaks Spanish better": None,
+    "¿Cuáles son las tasas de éxito para mujeres de 35 años?": "medical_inquiry",
+    "IVF cost": "cost_question",
+    "Is IVF expensive?": "cost_question",
+    "ivf insurance": "cost_question",
+    "Which IVF clinic should I book?": "appointment_request",
+    "I'm stressed about IVF": "emotional_support",
+    "What are the success rates for women over 35?": "medical_inquiry",
+}
+
+# Expected labels with CHAT_INTENTS enabled, as chat_server.py classifies
+CHAT_EXAMPLE_INTENTS = {
+    **EXAMPLE_INTENTS,
+    "¿Cuáles son las tasas de éxito para mujeres de 35 años?": "success_rates",
+    "What are the success rates for women over 35?": "success_rates",
+    "How long does the timeline take?": "treatment_timeline",
+    "Hello there": "greeting",
+    "Hi, how much does IVF cost?": "cost_question",
+}
+
+
+def load_intents(path=CAPABILITIES_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['natural_language_processing']['intent_recognition']
+
+
+def chat_intents(path=CAPABILITIES_PATH):
+    return load_intents(path) + list(CHAT_INTENTS)
+
+
+# Labels are cached for messages up to this long; the cache is emptied when it
+# fills up
+CACHE_SIZE = 10000
+CACHE_MESSAGE_LENGTH = 200
+
+# Runs of characters that are neither word characters nor whitespace; they are
+# replaced by a \x00 token so a phrase cannot match across punctuation ("lab,
+# report" is not "lab report")
+PUNCTUATION = re.compile(r'[^\w\s]+')
+# The same for ASCII messages in one translate: bytes lowercased, whitespace kept
+# and every other byte \w does not match turned into \x00
+TOKEN_BYTES = bytes(ord(chr(byte).lower()) if chr(byte).isalnum() or byte == ord('_')
+                    else byte if chr(byte).isspace() else 0 for byte in range(128)) + bytes(range(128, 256))
+
+
+def words(message):
+    # The message's lowercase words (the \w+ runs) and punctuation markers, as
+    # UTF-8 bytes
+    if message.isascii():
+        return message.encode().translate(TOKEN_BYTES).replace(b'\0', b' \0 ').split()
+    return PUNCTUATION.sub(' \0 ', message.lower()).encode().split()
+
+
+class IntentClassifier:
+
+    def __init__(self, intents=None, keywords=INTENT_KEYWORDS):
+        self.intents = list(load_intents() if intents is None else intents)
+        self.weights = {}   # keyword -> (intent index, weight)
+        indices = {intent: index for index, intent in enumerate(self.intents)}
+        for intent, intent_keywords in keywords.items():
+            target = intent if intent in indices else PARENT_INTENTS.get(intent)
+            if target not in indices:
+                continue
+            for keyword in intent_keywords:
+                keyword = keyword.lower()
+                if keyword not in self.weights:
+                    weight = len(keyword.split()) * (GENERIC_WEIGHT if keyword in GENERIC_KEYWORDS else 1)
+                    self.weights[keyword] = (indices[target], weight * INTENT_WEIGHTS.get(intent, 1))
+        # Single-word keywords are counted by intersecting the message's words
+        # with the vocabulary. Phrases need a walk over the words (leftmost match,
+        # longest phrase first at each word, as a regex alternation would), but a
+        # phrase can only occur when its longest word does, so messages without
+        # any of those trigger words skip the walk.
+        self.single = {}    # one-word keyword -> (intent index, weight, keyword length)
+        self.phrases = {}   # first word -> [(words, (intent index, weight, keyword length))], longest first
+        triggers = set()
+        for keyword, (index, weight) in self.weights.items():
+            parts = words(keyword)
+            if len(parts) == 1:
+                self.single[parts[0]] = (index, weight, len(keyword))
+            else:
+                self.phrases.setdefault(parts[0], []).append((parts, (index, weight, len(keyword))))
+                triggers.add(max(parts, key=len))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda candidate: -len(candidate[0]))
+        self.triggers = frozenset(triggers)
+        self.vocabulary = frozenset(self.single) | self.triggers
+        self.starts = frozenset(self.single) | frozenset(self.phrases)
+        # Words that decide a message when they are its only keyword
+        self.alone = {word: self.intents[entry[0]] for word, entry in self.single.items() if word not in self.triggers}
+        self._cache = {}
+
+    def _found(self, tokens, hits):
+        # {intent index: [score, longest matched keyword length, -index]} for the
+        # keywords among tokens; every occurrence counts
+        single = self.single
+        if self.triggers.isdisjoint(hits):
+            matched = [single[word] + (tokens.count(word),) for word in hits]
+        else:
+            matched = []
+            phrases, starts = self.phrases, self.starts
+            end = 0
+            for i, token in enumerate(tokens):
+                if i < end or token not in starts:
+                    continue
+                end = i + 1
+                entry = single.get(token)
+                for parts, phrase in phrases.get(token, ()):
+                    if tokens[i:i + len(parts)] == parts:
+                        entry = phrase
+                        end = i + len(parts)
+                        break
+                if entry is not None:
+                    matched.append(entry + (1,))
+        found = {}
+        for index, weight, length, count in matched:
+            entry = found.get(index)
+            if entry is None:
+                found[index] = [weight * count, length, -index]
+            else:
+                entry[0] += weight * count
+                if length > entry[1]:
+                    entry[1] = length
+        return found
+
+    def matches(self, message):
+        # (score, length of the longest matched keyword) per intent
+        totals = [0] * len(self.intents)
+        longest = [0] * len(self.intents)
+        tokens = words(message)
+        for index, (total, length, _) in self._found(tokens, self.vocabulary.intersection(tokens)).items():
+            totals[index], longest[index] = total, length
+        return totals, longest
+
+    def scores(self, message):
+        return self.matches(message)[0]
+
+    def classify(self, message):
+        # Highest-scoring intent; ties go to the intent with the most specific
+        # (longest) matched keyword, and only then to the earlier intent. None
+        # when nothing matched.
+        cache = self._cache
+        if message in cache:
+            return cache[message]
+        intent = self._classify(message)
+        if len(message) <= CACHE_MESSAGE_LENGTH:
+            if len(cache) >= CACHE_SIZE:
+                cache.clear()
+            cache[message] = intent
+        return intent
+
+    def _classify(self, message):
+        tokens = words(message)
+        hits = self.vocabulary.intersection(tokens)
+        if not hits:
+            return None
+        if len(hits) == 1:
+            # A lone keyword that is no phrase trigger decides on its own (the
+            # common case)
+            for word in hits:
+                if word in self.alone:
+                    return self.alone[word]
+        found = self._found(tokens, hits)
+        if not found:
+            return None
+        return self.intents[-max(found.values())[2]]
+
+    def classify_many(self, messages):
+        classify = self.classify
+        return [classify(message) for message in messages]
+
+    def label_log(self, path, out_path, roles=('user',)):
+        # Adds an "intent" field to each turn of a JSONL conversation log (the
+        # script.py --logs format), streaming one record at a time
+        labeled = 0
+        with open(path, encoding='utf-8') as f, open(out_path, 'w', encoding='utf-8') as out:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get('role') in roles and 'message' in record:
+                    record['intent'] = self.classify(record['message'])
+                    labeled += 1
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        return labeled
+
+
+def cascade_response(message):
+    # Python port of the generateBotResponse keyword cascade, for benchmarking
+    message = message.lower()
+    if 'what is ivf' in message or 'ivf' in message or ('what' in message and 'ivf' in message):
+        return 'info'
+    elif 'cost' in message or 'price' in message or 'expensive' in message or 'money' in message:
+        return 'cost'
+    elif 'success' in message or 'rate' in message or 'chance' in message or 'odds' in message:
+        return 'success'
+    elif 'timeline' in message or 'how long' in message or 'duration' in message or 'time' in message:
+        return 'timeline'
+    elif 'support' in message or 'help' in message or 'emotional' in message or 'stress' in message:
+        return 'support'
+    elif 'clinic' in message or 'doctor' in message or 'find' in message or 'recommend' in message:
+        return 'clinics'
+    elif 'hello' in message or 'hi' in message or 'hey' in message or 'greeting' in message:
+        return 'greeting'
+    return None
+
+
+def example_messages(path=EXAMPLES_PATH):
+    with open(path, encoding='utf-8') as f:
+        examples = json.load(f)
+    return [turn['message'] for turns in examples.values() for turn in turns if turn['role'] == 'user']
+
+
+def check_messages(expected=EXAMPLE_INTENTS):
+    # Example user turns followed by the extra messages in expected
+    return list(dict.fromkeys(example_messages() + list(expected)))
+
+
+def check_examples(classifier, expected=EXAMPLE_INTENTS):
+    # Returns (message, expected, actual) for every checked message that is mislabeled
+    failures = []
+    for message in check_messages(expected):
+        actual = classifier.classify(message)
+        expected_intent = expected.get(message)
+        if actual != expected_intent:
+            failures.append((message, expected_intent, actual))
+    return failures
+
+
+def benchmark(classifier, count, seed=0):
+    # Messages drawn from a small pool, as chat traffic repeats itself, and the
+    # same messages made distinct so nothing is answered from the cache
+    rng = random.Random(seed)
+    pool = example_messages() + [
+        "How much does IVF cost with insurance?",
+        "I'm feeling really anxious and overwhelmed about this",
+        "Can I book an appointment with a specialist next week?",
+        "What are the success rates for women over 40?",
+        "Please analyze this lab report, my AMH seems low",
+        "this is my third cycle and I'm worried about the side effects",
+    ]
+    repeated = [rng.choice(pool) for _ in range(count)]
+    distinct = [f"{message} #{i}" for i, message in enumerate(repeated)]
+
+    for label, messages in (("repeated", repeated), ("distinct", distinct)):
+        started = time.perf_counter()
+        for message in messages:
+            cascade_response(message)
+        cascade_elapsed = time.perf_counter() - started
+
+        classifier._cache.clear()
+        started = time.perf_counter()
+        classifier.classify_many(messages)
+        classifier_elapsed = time.perf_counter() - started
+
+        print(f"{label} messages:")
+        print(f"  includes() cascade: {count:,} messages in {cascade_elapsed:.2f}s ({count / cascade_elapsed:,.0f}/s)")
+        print(f"  intent classifier:  {count:,} messages in {classifier_elapsed:.2f}s ({count / classifier_elapsed:,.0f}/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify chat messages into intents")
+    parser.add_argument('--label', nargs=2, metavar=('LOG', 'OUT'), help="label the user turns of a JSONL conversation log")
+    parser.add_argument('--check', action='store_true', help="check labels on the turns in conversation_examples.json")
+    parser.add_argument('--benchmark', type=int, metavar='MESSAGES', help="benchmark against the app.js keyword cascade")
+    parser.add_argument('messages', nargs='*', help="messages to classify")
+    args = parser.parse_args(argv)
+
+    classifier = IntentClassifier()
+    status = 0
+    if args.check:
+        for label, checked, expected in (("intent_recognition", classifier, EXAMPLE_INTENTS),
+                                         ("chat", IntentClassifier(chat_intents()), CHAT_EXAMPLE_INTENTS)):
+            failures = check_examples(checked, expected)
+            for message, expected_intent, actual in failures:
+                print(f"MISLABELED ({label}) {message!r}: expected {expected_intent}, got {actual}")
+            total = len(check_messages(expected))
+            print(f"{label}: {total - len(failures)}/{total} example messages labeled correctly")
+            status = status or (1 if failures else 0)
+    if args.label:
+        labeled = classifier.label_log(*args.label)
+        print(f"Labeled {labeled:,} turns into {args.label[1]}")
+    if args.benchmark:
+        benchmark(classifier, args.benchmark)
+    for message in args.messages:
+        print(f"{classifier.classify(message)}\t{message}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# Layered (Sugiyama-style) layout for user-journey graphs.
+# Replaces hand-placed positions for graphs mined from logs: break cycles, assign
+# layers by longest path, route long edges through dummy nodes, reduce crossings
+# with barycenter sweeps and turn layer/order into x/y coordinates. Every phase
+# is linear in nodes + edges apart from the per-layer sorts.
+import argparse
+import random
+import sys
+import time
+
+
+def break_cycles(n, successors):
+    # Iterative DFS; edges pointing back into the DFS stack are reversed
+    state = [0] * n   # 0 unvisited, 1 on stack, 2 finished
+    dag = [[] for _ in range(n)]
+    for root in range(n):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [(root, iter(successors[root]))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if state[child] == 1:
+                    dag[child].append(node)
+                    continue
+                dag[node].append(child)
+                if state[child] == 0:
+                    state[child] = 1
+                    stack.append((child, iter(successors[child])))
+                    break
+            else:
+                state[node] = 2
+                stack.pop()
+    return dag
+
+
+def assign_layers(n, dag):
+    # Longest path from the sources, in topological (Kahn) order
+    indegree = [0] * n
+    for children in dag:
+        for child in children:
+            indegree[child] += 1
+    layer = [0] * n
+    queue = [node for node in range(n) if not indegree[node]]
+    for node in queue:
+        for child in dag[node]:
+            layer[child] = max(layer[child], layer[node] + 1)
+            indegree[child] -= 1
+            if not indegree[child]:
+                queue.append(child)
+    return layer
+
+
+def count_crossings(layers, down, position):
+    # Edge crossings between every pair of adjacent layers, counted as
+    # inversions with a Fenwick tree
+    total = 0
+    for upper, lower in zip(layers, layers[1:]):
+        edges = sorted((position[node], position[child]) for node in upper for child in down[node])
+        tree = [0] * (len(lower) + 1)
+        for seen, (_, target) in enumerate(edges):
+            # Edges seen so far that land to the right of this one cross it
+            i, smaller_or_equal = target + 1, 0
+            while i:
+                smaller_or_equal += tree[i]
+                i -= i & -i
+            total += seen - smaller_or_equal
+            i = target + 1
+            while i <= len(lower):
+                tree[i] += 1
+                i += i & -i
+    return total
+
+
+def barycenter_sweep(layers, neighbours, position):
+    # Reorders each layer by the mean position of its neighbours in the layer
+    # processed just before it
+    for layer in layers:
+        keys = {}
+        for node in layer:
+            adjacent = neighbours[node]
+            keys[node] = (sum(position[other] for other in adjacent) / len(adjacent) if adjacent else position[node],
+                          position[node])
+        layer.sort(key=keys.__getitem__)
+        for i, node in enumerate(layer):
+            position[node] = i
+
+
+def layered_layout(nodes, edges, sweeps=4, x_spacing=2.0, y_spacing=2.0, max_span=8, stats=None):
+    # nodes: node names in display order; edges: (from, to) pairs.
+    # Returns {node: (x, y)} with the first layer at the top.
+    # Edges spanning more than max_span layers are drawn but left out of crossing
+    # reduction, which keeps the dummy count (and the whole layout) linear in the
+    # number of edges on deep graphs.
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    successors = [[] for _ in range(n)]
+    for source, target in edges:
+        if source != target:
+            successors[index[source]].append(index[target])
+
+    dag = break_cycles(n, successors)
+    layer_of = assign_layers(n, dag)
+
+    # Split edges spanning several layers with dummy nodes so crossing reduction
+    # sees every edge segment
+    down = [[] for _ in range(n)]
+    up = [[] for _ in range(n)]
+    for node in range(n):
+        for child in dag[node]:
+            if layer_of[child] - layer_of[node] > max_span:
+                continue
+            previous = node
+            for layer in range(layer_of[node] + 1, layer_of[child]):
+                dummy = len(layer_of)
+                layer_of.append(layer)
+                down.append([])
+                up.append([previous])
+                down[previous].append(dummy)
+                previous = dummy
+            down[previous].append(child)
+            up[child].append(previous)
+
+    layers = [[] for _ in range(max(layer_of, default=-1) + 1)]
+    for node, layer in enumerate(layer_of):
+        layers[layer].append(node)
+    position = [0] * len(layer_of)
+    for layer in layers:
+        for i, node in enumerate(layer):
+            position[node] = i
+
+    best_crossings = count_crossings(layers, down, position)
+    best = list(position)
+    if stats is not None:
+        stats['initial_crossings'] = best_crossings
+        stats['dummies'] = len(layer_of) - n
+    for sweep in range(sweeps):
+        if best_crossings == 0:
+            break
+        if sweep % 2 == 0:
+            barycenter_sweep(layers[1:], up, position)
+        else:
+            barycenter_sweep(layers[-2::-1], down, position)
+        crossings = count_crossings(layers, down, position)
+        if crossings < best_crossings:
+            best_crossings, best = crossings, list(position)
+    if stats is not None:
+        stats['crossings'] = best_crossings
+
+    widths = [len(layer) for layer in layers]
+    top = len(layers) - 1
+    return {
+        node: ((best[i] - (widths[layer_of[i]] - 1) / 2) * x_spacing, (top - layer_of[i]) * y_spacing)
+        for i, node in enumerate(nodes)
+    }
+
+
+def layout_journey(data, **options):
+    # Positions for chart_script's data["user_journey"] / data["interactions"]
+    nodes = [step["step"] for step in data["user_journey"]]
+    edges = [(interaction["from"], interaction["to"]) for interaction in data["interactions"]]
+    return layered_layout(nodes, edges, **options)
+
+
+def synthetic_journey(size, seed=0):
+    # Random journey graph shaped like mined logs: steps fan out stage by stage
+    # (about sqrt(size) stages), mostly linking to the stage or two before, plus a
+    # few loops back to earlier steps
+    rng = random.Random(seed)
+    types = ["entry", "bot_response", "decision", "feature", "ai_process", "action"]
+    steps = [{"step": f"Step {i}", "type": types[0] if i == 0 else rng.choice(types[1:]),
+              "description": f"Synthetic step {i}"} for i in range(size)]
+    width = max(1, int(size ** 0.5))
+    interactions = []
+    for i in range(1, size):
+        for _ in range(rng.choice((1, 1, 2))):
+            source = max(0, i - rng.randint(1, 2 * width))
+            interactions.append({"from": f"Step {source}", "to": f"Step {i}", "type": "branch"})
+        if rng.random() < 0.01:
+            interactions.append({"from": f"Step {i}", "to": f"Step {rng.randrange(i)}", "type": "loop"})
+    return {"user_journey": steps, "interactions": interactions}
+
+
+def benchmark(sizes):
+    from chart_script import build_figure
+
+    for size in sizes:
+        data = synthetic_journey(size)
+        stats = {}
+        started = time.perf_counter()
+        positions = layout_journey(data, stats=stats)
+        layout_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        fig = build_figure(data, positions)
+        fig.to_dict()
+        figure_elapsed = time.perf_counter() - started
+        mode = 'webgl' if fig.data[0].type == 'scattergl' else 'svg'
+        print(f"{size:>6,} nodes, {len(data['interactions']):>6,} edges: layout {layout_elapsed:.2f}s "
+              f"({stats['dummies']:,} dummies, crossings {stats['initial_crossings']:,} -> {stats['crossings']:,}), "
+              f"{mode} figure {figure_elapsed:.2f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the layered journey layout on synthetic graphs")
+    parser.add_argument('sizes', nargs='*', type=int, default=[100, 1000, 10000])
+    args = parser.parse_args(argv)
+    benchmark(args.sizes)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
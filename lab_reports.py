@@ -0,0 +1,427 @@
+# Ingestion pipeline for uploaded lab reports (text or PDF).
+# Pulls TSH, Prolactin, AMH and FSH out of each report and checks them against
+# the reference ranges used in the document_analysis conversation. Files are
+# read and hashed on a thread pool, parsed in chunks on a process pool, and each
+# finished chunk is range-checked in one vectorized pass and yielded straight
+# away. Re-uploaded files are recognised by content hash and never parsed twice.
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from script import conversation_examples
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+# Reference ranges in the units reports are normalised to. TSH and Prolactin are
+# the ranges quoted in the document_analysis example; AMH and FSH bounds put its
+# 1.2 ng/mL AMH below and 8.5 mIU/mL FSH above range, as the example reply says.
+REFERENCE_RANGES = {
+    "TSH": (0.5, 4.5, "mIU/L"),
+    "Prolactin": (2.0, 25.0, "ng/mL"),
+    "AMH": (1.5, 4.0, "ng/mL"),
+    "FSH": (3.0, 8.0, "mIU/mL"),
+}
+ANALYTES = tuple(REFERENCE_RANGES)
+LOW = np.array([REFERENCE_RANGES[name][0] for name in ANALYTES])
+HIGH = np.array([REFERENCE_RANGES[name][1] for name in ANALYTES])
+
+ALIASES = {
+    "TSH": ("tsh", "thyroid stimulating hormone", "thyroid-stimulating hormone"),
+    "Prolactin": ("prolactin", "prl"),
+    "AMH": ("amh", "anti-mullerian hormone", "anti-müllerian hormone", "antimullerian hormone"),
+    "FSH": ("fsh", "follicle stimulating hormone", "follicle-stimulating hormone"),
+}
+# Multipliers from units labs also report in to the reference unit
+UNIT_FACTORS = {
+    ("AMH", "pmol/l"): 1 / 7.14,
+    ("Prolactin", "miu/l"): 1 / 21.2,
+    ("Prolactin", "µg/l"): 1.0,
+    ("Prolactin", "ug/l"): 1.0,
+}
+
+ANALYTE_BY_ALIAS = {alias: name for name, aliases in ALIASES.items() for alias in aliases}
+# Analyte name, then the first number after a short label on the same line (skips
+# ":", "-", "(serum)" and the like, plus label digits such as "Day 3" or "(3rd
+# generation)"), then an optional unit. The label run is possessive so a label
+# digit can never be taken as the value. A comma followed by exactly three digits
+# is a thousands separator ("1,060 mIU/L"), any other comma a decimal one ("9,2").
+LABEL_DIGITS = r'\bday\s*\d+\b|\b\d+(?:st|nd|rd|th)\b'
+VALUE_PATTERN = re.compile(
+    r'\b(' + '|'.join(sorted(map(re.escape, ANALYTE_BY_ALIAS), key=len, reverse=True)) + r')\b'
+    r'(?:' + LABEL_DIGITS + r'|[^\d\n]){0,40}+(\d{1,3}(?:,\d{3})+(?:\.\d+)?(?!\d)|\d+(?:[.,]\d+)?)\s*([a-zµμ]+/[a-z]+)?',
+    re.IGNORECASE)
+THOUSANDS = re.compile(r'\d{1,3}(?:,\d{3})+(?:\.\d+)?')
+
+MISSING, BELOW, NORMAL, ABOVE = range(4)
+STATUS_NAMES = ('missing', 'low', 'normal', 'high')
+
+PDF_STREAM = re.compile(rb'<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream', re.S)
+PDF_TEXT = re.compile(rb'\(((?:\\.|[^\\)])*)\)\s*Tj|\[((?:\\.|[^\]])*)\]\s*TJ', re.S)
+PDF_STRING = re.compile(rb'\(((?:\\.|[^\\)])*)\)', re.S)
+PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def pdf_unescape(raw):
+    return re.sub(rb'\\([nrtbf()\\]|[0-7]{1,3})',
+                  lambda m: bytes([int(m.group(1), 8) & 0xFF]) if m.group(1)[:1].isdigit()
+                  else PDF_ESCAPES.get(m.group(1), m.group(1)), raw)
+
+
+def simple_pdf_text(content):
+    # Text from Tj/TJ operators in (optionally Flate-compressed) content streams.
+    # Enough for the machine-generated reports labs send; pypdf is used instead
+    # when it is installed.
+    lines = []
+    for dictionary, stream in PDF_STREAM.findall(content):
+        if b'/FlateDecode' in dictionary:
+            try:
+                stream = zlib.decompress(stream)
+            except zlib.error:
+                continue
+        for shown, array in PDF_TEXT.findall(stream):
+            parts = PDF_STRING.findall(array) if array else [shown]
+            lines.append(b''.join(pdf_unescape(part) for part in parts).decode('latin-1'))
+    return '\n'.join(lines)
+
+
+def extract_text(content):
+    if content.startswith(b'%PDF'):
+        if PdfReader is not None:
+            return '\n'.join(page.extract_text() or '' for page in PdfReader(io.BytesIO(content)).pages)
+        return simple_pdf_text(content)
+    return content.decode('utf-8', errors='replace')
+
+
+def extract_values(text):
+    # [value per analyte in ANALYTES order], NaN where the report has none; the
+    # first mention of an analyte wins
+    values = [np.nan] * len(ANALYTES)
+    for alias, number, unit in VALUE_PATTERN.findall(text):
+        name = ANALYTE_BY_ALIAS[alias.lower()]
+        index = ANALYTES.index(name)
+        if values[index] == values[index]:
+            continue
+        value = float(number.replace(',', '') if THOUSANDS.fullmatch(number) else number.replace(',', '.'))
+        values[index] = value * UNIT_FACTORS.get((name, unit.lower().replace('μ', 'µ')), 1.0)
+    return values
+
+
+def parse_chunk(chunk):
+    # Process pool entry point: [(digest, content)] -> [(digest, values, error)]
+    parsed = []
+    for digest, content in chunk:
+        try:
+            parsed.append((digest, extract_values(extract_text(content)), None))
+        except Exception as exc:   # a corrupt upload must not take the chunk down
+            parsed.append((digest, None, f"{type(exc).__name__}: {exc}"))
+    return parsed
+
+
+def read_report(path):
+    # (path, sha256, content, error)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except OSError as exc:
+        return path, None, None, str(exc)
+    return path, hashlib.sha256(content).hexdigest(), content, None
+
+
+def read_reports(paths):
+    # Thread pool entry point; a few files per task keeps executor overhead low
+    return [read_report(path) for path in paths]
+
+
+def check_ranges(values):
+    # (reports, analytes) float array -> int8 status codes, one vectorized pass
+    values = np.asarray(values, dtype=np.float64)
+    status = np.where(np.isnan(values), MISSING, NORMAL).astype(np.int8)
+    status[values < LOW] = BELOW
+    status[values > HIGH] = ABOVE
+    return status
+
+
+def report_result(path, digest, values=None, status=None, error=None):
+    # values and status are plain lists for one report (see check_ranges)
+    analytes = {}
+    if values is not None:
+        for name, value, code in zip(ANALYTES, values, status):
+            low, high, unit = REFERENCE_RANGES[name]
+            analytes[name] = {"value": None if value != value else value, "unit": unit,
+                              "range": [low, high], "status": STATUS_NAMES[code]}
+    return {"path": path, "sha256": digest, "analytes": analytes, "duplicate_of": None, "error": error}
+
+
+class LabReportPipeline:
+    # Keeps parsed results by content hash for its whole lifetime, so a file
+    # uploaded again (under any name) is answered from the first parse
+
+    def __init__(self, workers=None, io_threads=8, chunk_size=64, max_in_flight=1024, io_batch=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.io_threads = io_threads
+        self.io_batch = io_batch
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+        self.results = {}   # sha256 -> result of the first upload
+        self.parsed = 0
+        self.duplicates = 0
+
+    def duplicate(self, path, original):
+        self.duplicates += 1
+        return {**original, "path": path, "duplicate_of": original["path"]}
+
+    def ingest(self, paths):
+        # Yields one result dict per path, in completion order
+        paths = iter(paths)
+        reading = set()
+        parsing = set()
+        chunk = []
+        waiting = {}   # sha256 -> [paths] read while the first copy is being parsed
+        exhausted = False
+        with ThreadPoolExecutor(self.io_threads) as io_pool, ProcessPoolExecutor(self.workers) as parse_pool:
+            while True:
+                while not exhausted and len(reading) * self.io_batch + len(chunk) < self.max_in_flight:
+                    batch = list(itertools.islice(paths, self.io_batch))
+                    exhausted = len(batch) < self.io_batch
+                    if batch:
+                        reading.add(io_pool.submit(read_reports, batch))
+                # Hand work to idle parse workers straight away; otherwise wait for
+                # a full chunk so per-task overhead stays small
+                if chunk and (len(chunk) >= self.chunk_size or len(parsing) < self.workers
+                              or (exhausted and not reading)):
+                    parsing.add(parse_pool.submit(parse_chunk, chunk))
+                    chunk = []
+                if not reading and not parsing and not chunk:
+                    break
+
+                done, _ = wait(reading | parsing, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in reading:
+                        reading.discard(future)
+                        for path, digest, content, error in future.result():
+                            if error:
+                                yield report_result(path, None, error=error)
+                            elif digest in self.results:
+                                yield self.duplicate(path, self.results[digest])
+                            elif digest in waiting:
+                                waiting[digest].append(path)
+                            else:
+                                waiting[digest] = [path]
+                                chunk.append((digest, content))
+                    else:
+                        parsing.discard(future)
+                        yield from self.finish_chunk(future.result(), waiting)
+
+    def finish_chunk(self, parsed, waiting):
+        ok = [(digest, values) for digest, values, error in parsed if error is None]
+        finished = []
+        if ok:
+            values = np.array([values for _, values in ok], dtype=np.float64)
+            status = check_ranges(values).tolist()
+            values = np.round(values, 3).tolist()
+            finished = [(digest, report_result(None, digest, values[i], status[i])) for i, (digest, _) in enumerate(ok)]
+        finished += [(digest, report_result(None, digest, error=error))
+                     for digest, values, error in parsed if error is not None]
+        for digest, result in finished:
+            first, *copies = waiting.pop(digest)
+            result["path"] = first
+            self.results[digest] = result
+            self.parsed += 1
+            yield result
+            for path in copies:
+                yield self.duplicate(path, result)
+
+
+def ingest_serial(paths):
+    # One report at a time with no pools; the benchmark baseline
+    seen = {}
+    for path in paths:
+        path, digest, content, error = read_report(path)
+        if error:
+            yield report_result(path, None, error=error)
+        elif digest in seen:
+            yield {**seen[digest], "path": path, "duplicate_of": seen[digest]["path"]}
+        else:
+            values = extract_values(extract_text(content))
+            status = check_ranges([values])[0].tolist()
+            seen[digest] = report_result(path, digest, np.round(values, 3).tolist(), status)
+            yield seen[digest]
+
+
+def pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)').encode('latin-1', errors='replace')
+
+
+def simple_pdf(lines):
+    # Single-page PDF with one Flate-compressed text stream
+    content = b'BT /F1 11 Tf 14 TL 50 780 Td ' + b''.join(b'(' + pdf_escape(line) + b') Tj T* ' for line in lines) + b'ET'
+    stream = zlib.compress(content)
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream',
+    ]
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % number + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_report(rng, index):
+    # Report lines in a few lab layouts: aliases, separators, optional units,
+    # AMH sometimes in pmol/L and the odd analyte left out
+    lines = [f"Patient ID: P{index:06d}", f"Collected: 2025-08-{rng.randint(1, 28):02d}", "Hormone panel", ""]
+    for name in ANALYTES:
+        if rng.random() < 0.05:
+            continue
+        low, high, unit = REFERENCE_RANGES[name]
+        value = rng.uniform(low * 0.5, high * 1.4)
+        label = rng.choice(ALIASES[name]).title() if rng.random() < 0.3 else name
+        if name == "AMH" and rng.random() < 0.3:
+            value, unit = value * 7.14, "pmol/L"
+        if name == "Prolactin" and rng.random() < 0.3:
+            value, unit = value * 21.2, "mIU/L"
+        separator = rng.choice((": ", " - ", " ", " (serum): ", " Day 3: ", " (3rd generation): "))
+        lines.append(f"{label}{separator}{value:,.2f} {unit}   ref {low}-{high}")
+    lines += ["", "Comments: results should be interpreted by your physician."]
+    return lines
+
+
+def write_synthetic_reports(directory, count, pdf_share=0.2, duplicate_share=0.05, seed=0):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        if paths and rng.random() < duplicate_share:
+            # A re-upload of an earlier report under a new name
+            source = rng.choice(paths)
+            path = os.path.join(directory, f"reupload_{i:06d}{os.path.splitext(source)[1]}")
+            shutil.copyfile(source, path)
+        elif rng.random() < pdf_share:
+            path = os.path.join(directory, f"report_{i:06d}.pdf")
+            with open(path, 'wb') as f:
+                f.write(simple_pdf(synthetic_report(rng, i)))
+        else:
+            path = os.path.join(directory, f"report_{i:06d}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(synthetic_report(rng, i)))
+        paths.append(path)
+    return paths
+
+
+def check_example():
+    # The document_analysis reply sorts the example's values into normal and
+    # "needs attention"; extraction plus the range check must agree, for the text
+    # and for the same report as a PDF
+    reply = next(turn["message"] for turn in conversation_examples["document_analysis"] if "TSH" in turn["message"])
+    expected = {"TSH": "normal", "Prolactin": "normal", "AMH": "low", "FSH": "high"}
+    failures = []
+    for label, content in (("text", reply.encode('utf-8')), ("pdf", simple_pdf(reply.split('\n')))):
+        values = extract_values(extract_text(content))
+        status = check_ranges([values])[0]
+        found = {name: STATUS_NAMES[code] for name, code in zip(ANALYTES, status)}
+        if found != expected:
+            failures.append(f"{label}: {found}")
+    # Digits in the label are not the value
+    for line, name, value in (("FSH Day 3: 8.5 IU/L", "FSH", 8.5), ("TSH (3rd generation): 2.1 mIU/L", "TSH", 2.1),
+                              ("Prolactin cycle day 21 - 18 ng/mL", "Prolactin", 18.0)):
+        found = extract_values(line)[ANALYTES.index(name)]
+        if found != value:
+            failures.append(f"{line!r}: {name}={found}")
+    # Thousands separators are not decimal commas: 1,060 mIU/L is ~50 ng/mL, high
+    for line, name, status in (("Prolactin: 1,060 mIU/L", "Prolactin", "high"), ("FSH: 9,2 mIU/mL", "FSH", "high"),
+                               ("Prolactin: 1,060.5 mIU/L", "Prolactin", "high")):
+        found = STATUS_NAMES[check_ranges([extract_values(line)])[0][ANALYTES.index(name)]]
+        if found != status:
+            failures.append(f"{line!r}: {name} {found}, expected {status}")
+    return failures
+
+
+def benchmark(count, workers=None, io_threads=8):
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        paths = write_synthetic_reports(tmp, count)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{count:,} synthetic reports ({size / 2**20:.1f} MiB) written in {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        serial = {result["path"]: result for result in ingest_serial(paths)}
+        elapsed = time.perf_counter() - started
+        print(f"  serial:   {elapsed:.2f}s ({count / elapsed:,.0f} reports/s)")
+
+        pipeline = LabReportPipeline(workers, io_threads)
+        started = time.perf_counter()
+        first = None
+        results = {}
+        for result in pipeline.ingest(paths):
+            if first is None:
+                first = time.perf_counter() - started
+            results[result["path"]] = result
+        elapsed = time.perf_counter() - started
+        print(f"  pipeline: {elapsed:.2f}s ({count / elapsed:,.0f} reports/s) with {pipeline.workers} parse processes, "
+              f"{io_threads} I/O threads; first result after {first * 1000:.0f} ms")
+        print(f"  {pipeline.parsed:,} parsed, {pipeline.duplicates:,} duplicates answered from the hash cache")
+
+        statuses = np.array([[STATUS_NAMES.index(result["analytes"][name]["status"]) for name in ANALYTES]
+                             for result in results.values() if result["analytes"]])
+        for i, name in enumerate(ANALYTES):
+            counts = np.bincount(statuses[:, i], minlength=len(STATUS_NAMES))
+            print(f"  {name:<10}" + ", ".join(f"{status} {n:,}" for status, n in zip(STATUS_NAMES, counts)))
+        # Which copy of a re-upload counts as the original depends on read order,
+        # so only the extracted values and statuses are compared
+        return all(results[path]["analytes"] == serial[path]["analytes"] for path in serial)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract hormone values from lab reports and check reference ranges")
+    parser.add_argument('paths', nargs='*', help="text or PDF reports; results are printed as JSON lines")
+    parser.add_argument('--workers', type=int, help="parse processes (default: CPU count)")
+    parser.add_argument('--threads', type=int, default=8, help="I/O threads")
+    parser.add_argument('--check', action='store_true', help="check extraction against the document_analysis example")
+    parser.add_argument('--benchmark', type=int, metavar='REPORTS', help="ingest REPORTS synthetic reports")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = check_example()
+        for failure in failures:
+            print(f"MISMATCH {failure}")
+        print("Lab report extraction matches the document_analysis example" if not failures else "Extraction differs")
+        return 1 if failures else 0
+    if args.benchmark:
+        if not benchmark(args.benchmark, args.workers, args.threads):
+            print("Pipeline results differ from the serial baseline")
+            return 1
+        return 0
+    if not args.paths:
+        parser.error("no reports given")
+    pipeline = LabReportPipeline(args.workers, args.threads)
+    for result in pipeline.ingest(args.paths):
+        print(json.dumps(result, ensure_ascii=False), flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+# Vectorized session/feature/journey metrics over columnar conversation events.
+# Produces the same user_interaction_patterns tables as script.py's streaming
+# aggregator, but with NumPy/pandas group reductions instead of per-row Python.
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from script import feature_tag, ordered_keys, parse_timestamp, user_interaction_patterns
+
+EPOCH = datetime(1970, 1, 1)
+
+# Columnar layout: one entry per turn in the turn columns, plus a flat feature
+# column where feature_turn[i] is the turn that feature[i] belongs to. Timestamps
+# are int64 epoch seconds and missing ratings are NaN.
+TURN_COLUMNS = ('session_id', 'session_type', 'stage', 'role', 'timestamp', 'rating')
+
+
+def epoch_seconds(value):
+    return int((parse_timestamp(value) - EPOCH).total_seconds())
+
+
+def records_to_columns(records):
+    # Converts script.py log records (dicts) to the columnar layout
+    turns = {name: [] for name in TURN_COLUMNS}
+    feature, feature_turn = [], []
+    for record in records:
+        if record.get('session_id') is None:
+            continue
+        index = len(turns['session_id'])
+        turns['session_id'].append(record['session_id'])
+        turns['session_type'].append(record.get('session_type'))
+        turns['stage'].append(record.get('stage'))
+        turns['role'].append(record.get('role'))
+        turns['timestamp'].append(epoch_seconds(record['timestamp']))
+        rating = record.get('rating')
+        turns['rating'].append(np.nan if rating is None else rating)
+        for tag in record.get('features', ()):
+            feature.append(tag)
+            feature_turn.append(index)
+
+    columns = {name: np.asarray(values, dtype=object) for name, values in turns.items()}
+    columns['timestamp'] = np.asarray(turns['timestamp'], dtype=np.int64)
+    columns['rating'] = np.asarray(turns['rating'], dtype=np.float64)
+    columns['feature'] = np.asarray(feature, dtype=object)
+    columns['feature_turn'] = np.asarray(feature_turn, dtype=np.int64)
+    return columns
+
+
+def compute_patterns(columns, reference=user_interaction_patterns):
+    session_codes, _ = pd.factorize(columns['session_id'])
+    type_codes, type_names = pd.factorize(columns['session_type'])
+    stage_codes, stage_names = pd.factorize(columns['stage'])
+
+    # One grouped pass gives every per-session quantity; type and stage come from
+    # the session's first turn, as in the streaming aggregator
+    sessions = pd.DataFrame({
+        'session': session_codes,
+        'timestamp': columns['timestamp'],
+        'user': np.asarray(columns['role'] == 'user'),
+        'type': type_codes,
+        'stage': stage_codes,
+    }).groupby('session', sort=False).agg(
+        first=('timestamp', 'min'),
+        last=('timestamp', 'max'),
+        user_turns=('user', 'sum'),
+        type=('type', 'first'),
+        stage=('stage', 'first'),
+    )
+    total = len(sessions) or 1
+    minutes = (sessions['last'].to_numpy() - sessions['first'].to_numpy()) / 60
+
+    session_type = sessions['type'].to_numpy()
+    typed = session_type >= 0
+    type_sessions = np.bincount(session_type[typed], minlength=len(type_names))
+    type_minutes = np.bincount(session_type[typed], weights=minutes[typed], minlength=len(type_names))
+
+    session_stage = sessions['stage'].to_numpy()
+    staged = session_stage >= 0
+    stage_sessions = np.bincount(session_stage[staged], minlength=len(stage_names))
+    stage_turns = np.bincount(session_stage[staged], weights=sessions['user_turns'].to_numpy()[staged],
+                              minlength=len(stage_names))
+
+    # Features: tracked tags only, usage counted once per session
+    tags = {feature_tag(row['feature']): row['feature'] for row in reference['feature_usage']}
+    feature_codes = pd.Index(list(tags)).get_indexer(columns['feature']).astype(np.int64)
+    feature_turn = columns['feature_turn']
+    tracked = feature_codes >= 0
+    feature_codes = feature_codes[tracked]
+    feature_turn = feature_turn[tracked]
+
+    pairs = pd.unique(session_codes[feature_turn].astype(np.int64) * len(tags) + feature_codes)
+    feature_sessions = np.bincount(pairs % len(tags), minlength=len(tags)) if len(tags) else []
+
+    ratings = columns['rating'][feature_turn]
+    rated = ~np.isnan(ratings)
+    rating_sum = np.bincount(feature_codes[rated], weights=ratings[rated], minlength=len(tags))
+    rating_count = np.bincount(feature_codes[rated], minlength=len(tags))
+
+    # Assemble the (small) output tables in the same shape as script.py
+    reference_types = {row['type']: row for row in reference['session_types']}
+    type_index = {name: i for i, name in enumerate(type_names)}
+    session_types = []
+    for name in ordered_keys(reference_types, [name for name in type_names if type_sessions[type_index[name]]]):
+        i = type_index[name]
+        session_types.append({
+            "type": name,
+            "percentage": round(100 * int(type_sessions[i]) / total),
+            "avg_duration_minutes": round(float(type_minutes[i]) / int(type_sessions[i])),
+            "features_used": reference_types.get(name, {}).get('features_used', []),
+        })
+
+    feature_usage = []
+    for i, name in enumerate(tags.values()):
+        feature_usage.append({
+            "feature": name,
+            "usage_rate": round(100 * int(feature_sessions[i]) / total),
+            "satisfaction": round(float(rating_sum[i]) / int(rating_count[i]), 1) if rating_count[i] else None,
+        })
+
+    reference_stages = {row['stage']: row for row in reference['user_journey_stages']}
+    stage_index = {name: i for i, name in enumerate(stage_names)}
+    user_journey_stages = []
+    for name in ordered_keys(reference_stages, [name for name in stage_names if stage_sessions[stage_index[name]]]):
+        i = stage_index[name]
+        stage = reference_stages.get(name, {})
+        user_journey_stages.append({
+            "stage": name,
+            "duration_days": stage.get('duration_days'),
+            "interactions": round(float(stage_turns[i]) / int(stage_sessions[i])),
+            "questions": stage.get('questions', []),
+        })
+
+    return {
+        "session_types": session_types,
+        "feature_usage": feature_usage,
+        "user_journey_stages": user_journey_stages,
+    }
+
+
+def compute_tables(columns, reference=user_interaction_patterns):
+    # Same three tables as session_types_analysis.csv, feature_usage_metrics.csv
+    # and user_journey_analysis.csv
+    patterns = compute_patterns(columns, reference)
+    return {
+        'session_types_analysis.csv': pd.DataFrame(patterns['session_types']),
+        'feature_usage_metrics.csv': pd.DataFrame(patterns['feature_usage']),
+        'user_journey_analysis.csv': pd.DataFrame(patterns['user_journey_stages']),
+    }
+
+
+def naive_patterns(columns, reference=user_interaction_patterns):
+    # Per-row loop over the same columns, used as the benchmark baseline
+    tags = {feature_tag(row['feature']): row['feature'] for row in reference['feature_usage']}
+    sessions = {}
+    for i in range(len(columns['session_id'])):
+        session = sessions.get(columns['session_id'][i])
+        timestamp = int(columns['timestamp'][i])
+        if session is None:
+            session = sessions[columns['session_id'][i]] = [
+                columns['session_type'][i], columns['stage'][i], timestamp, timestamp, 0, set()]
+        session[2] = min(session[2], timestamp)
+        session[3] = max(session[3], timestamp)
+        if columns['role'][i] == 'user':
+            session[4] += 1
+
+    ratings = {}
+    for i in range(len(columns['feature'])):
+        tag = columns['feature'][i]
+        if tag not in tags:
+            continue
+        turn = columns['feature_turn'][i]
+        sessions[columns['session_id'][turn]][5].add(tag)
+        rating = columns['rating'][turn]
+        if not np.isnan(rating):
+            totals = ratings.setdefault(tag, [0.0, 0])
+            totals[0] += rating
+            totals[1] += 1
+
+    total = len(sessions) or 1
+    types, stages, usage = {}, {}, {}
+    for session_type, stage, first, last, user_turns, used in sessions.values():
+        if session_type is not None:
+            counts = types.setdefault(session_type, [0, 0.0])
+            counts[0] += 1
+            counts[1] += (last - first) / 60
+        if stage is not None:
+            counts = stages.setdefault(stage, [0, 0])
+            counts[0] += 1
+            counts[1] += user_turns
+        for tag in used:
+            usage[tag] = usage.get(tag, 0) + 1
+
+    reference_types = {row['type']: row for row in reference['session_types']}
+    reference_stages = {row['stage']: row for row in reference['user_journey_stages']}
+    return {
+        "session_types": [{
+            "type": name,
+            "percentage": round(100 * types[name][0] / total),
+            "avg_duration_minutes": round(types[name][1] / types[name][0]),
+            "features_used": reference_types.get(name, {}).get('features_used', []),
+        } for name in ordered_keys(reference_types, types)],
+        "feature_usage": [{
+            "feature": name,
+            "usage_rate": round(100 * usage.get(tag, 0) / total),
+            "satisfaction": round(ratings[tag][0] / ratings[tag][1], 1) if tag in ratings else None,
+        } for tag, name in tags.items()],
+        "user_journey_stages": [{
+            "stage": name,
+            "duration_days": reference_stages.get(name, {}).get('duration_days'),
+            "interactions": round(stages[name][1] / stages[name][0]),
+            "questions": reference_stages.get(name, {}).get('questions', []),
+        } for name in ordered_keys(reference_stages, stages)],
+    }
+
+
+def synthetic_columns(turns, turns_per_session=15, seed=0, reference=user_interaction_patterns):
+    # Random columnar events shaped like production logs; strings are categoricals
+    # so that tens of millions of rows stay compact
+    rng = np.random.default_rng(seed)
+    n_sessions = max(1, turns // turns_per_session)
+    session_id = np.sort(rng.integers(0, n_sessions, turns))
+
+    type_rows = reference['session_types']
+    weights = np.array([row['percentage'] for row in type_rows], dtype=np.float64)
+    session_type = rng.choice(len(type_rows), n_sessions, p=weights / weights.sum())
+    stages = reference['user_journey_stages']
+    session_stage = rng.integers(0, len(stages), n_sessions)
+    session_start = 1756180800 + rng.integers(0, 86400 * 120, n_sessions)
+
+    tags = [feature_tag(row['feature']) for row in reference['feature_usage']] + ['empathy', 'quick_actions']
+    n_features = int(turns * 0.6)
+    feature_turn = np.sort(rng.integers(0, turns, n_features))
+    rated = rng.random(turns) < 0.1
+
+    return {
+        'session_id': session_id,
+        'session_type': pd.Categorical.from_codes(session_type[session_id], [row['type'] for row in type_rows]),
+        'stage': pd.Categorical.from_codes(session_stage[session_id], [row['stage'] for row in stages]),
+        'role': pd.Categorical.from_codes(rng.integers(0, 2, turns), ['user', 'bot']),
+        'timestamp': session_start[session_id] + rng.integers(0, 3600, turns),
+        'rating': np.where(rated, rng.integers(1, 6, turns), np.nan),
+        'feature': pd.Categorical.from_codes(rng.integers(0, len(tags), n_features), tags),
+        'feature_turn': feature_turn,
+    }
+
+
+def benchmark(turns, naive_turns):
+    columns = synthetic_columns(turns)
+    started = time.perf_counter()
+    compute_patterns(columns)
+    elapsed = time.perf_counter() - started
+    print(f"vectorized: {turns:,} turns in {elapsed:.2f}s ({turns / elapsed:,.0f} turns/s)")
+
+    # The loop baseline is run on a prefix so the benchmark finishes in reasonable time
+    sample = synthetic_columns(naive_turns)
+    started = time.perf_counter()
+    expected = naive_patterns(sample)
+    naive_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = compute_patterns(sample)
+    vector_elapsed = time.perf_counter() - started
+    print(f"naive loop: {naive_turns:,} turns in {naive_elapsed:.2f}s ({naive_turns / naive_elapsed:,.0f} turns/s)")
+    print(f"speedup on {naive_turns:,} turns: {naive_elapsed / vector_elapsed:.1f}x, "
+          f"results {'match' if actual == expected else 'DIFFER'}")
+    return actual == expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized metrics engine against a naive loop")
+    parser.add_argument('--turns', type=int, default=50_000_000, help="events for the vectorized run")
+    parser.add_argument('--naive-turns', type=int, default=1_000_000, help="events for the loop comparison")
+    args = parser.parse_args(argv)
+    return 0 if benchmark(args.turns, args.naive_turns) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,280 @@
+# Multilingual response catalog for the chat frontend and backend.
+# Compiles one small JSON bundle per language (intent -> message, plus the
+# fallback replies) under a content-hashed name, so app.js fetches a locale only
+# when the user switches to it and browsers can cache bundles forever. The same
+# catalog gives chat_server.py a flat (intent, language) lookup table.
+import argparse
+import asyncio
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_DIR = os.path.join(BASE_DIR, 'locales')
+APP_JS = os.path.join(BASE_DIR, 'app.js')
+
+# appData.languages in app.js
+LANGUAGES = ('en', 'es', 'fr', 'de', 'it', 'pt')
+
+# Keys that only make sense in the language itself; an untranslated bundle leaves
+# them out (app.js then falls back to its own "Language changed to ..." text)
+NO_FALLBACK = ("language_changed",)
+
+# Catalog keys follow appData.sampleResponses; chat_server's classifier intents
+# map onto them
+INTENT_KEYS = {
+    "medical_inquiry": "info",
+    "cost_question": "cost",
+    "appointment_request": "clinics",
+    "emotional_support": "support",
+    "document_analysis": "document",
+    "success_rates": "success",
+    "treatment_timeline": "timeline",
+    "greeting": "greeting",
+}
+
+RESPONSES = {
+    "en": {
+        "greeting": "Welcome! I'm here to help you navigate your fertility journey with personalized, evidence-based guidance.",
+        "cost": "IVF costs typically range from $12,000-$15,000 per cycle, plus medications ($3,000-$5,000). Let me help you calculate your personalized estimate using our cost calculator tool.",
+        "success": "Success rates vary by age and clinic. For women under 35, success rates are typically 65-70% per fresh cycle. Would you like a personalized assessment?",
+        "timeline": "A typical IVF cycle takes 6-8 weeks from start to pregnancy test. Let me show you the detailed timeline using our timeline tool.",
+        "support": "I understand this journey can be emotionally challenging. Remember, you're not alone, and there are many support resources available.",
+        "info": "IVF (In Vitro Fertilization) is a fertility treatment where eggs are retrieved from ovaries and fertilized with sperm in a laboratory. The resulting embryos are then transferred to the uterus. This process typically involves ovarian stimulation, egg retrieval, fertilization, embryo culture, and embryo transfer.",
+        "clinics": "I can help you find reputable fertility clinics in your area. Would you like me to search based on your location and specific needs?",
+        "document": "I'd be happy to help you understand your test results! Please use the file upload button 📎 to share your lab report.",
+        "language_changed": "Language changed to English. I can now assist you in English. How can I help you today?",
+    },
+    "es": {
+        "greeting": "¡Bienvenidos! Estoy aquí para ayudarles en su camino hacia la fertilidad con orientación personalizada y basada en evidencia.",
+        "cost": "El costo de la FIV suele estar entre $12,000 y $15,000 por ciclo, más medicamentos ($3,000-$5,000). Permítanme ayudarles a calcular una estimación personalizada con nuestra calculadora de costos.",
+        "success": "Las tasas de éxito varían según la edad y la clínica. Para mujeres menores de 35 años, suelen ser del 65-70% por ciclo fresco. ¿Les gustaría una evaluación personalizada?",
+        "timeline": "Un ciclo típico de FIV dura de 6 a 8 semanas desde el inicio hasta la prueba de embarazo. Permítanme mostrarles el cronograma detallado con nuestra herramienta de cronograma.",
+        "support": "Entiendo que este camino puede ser emocionalmente difícil. Recuerden que no están solos y que hay muchos recursos de apoyo disponibles.",
+        "info": "La FIV (Fecundación In Vitro) es un tratamiento de fertilidad en el que se extraen óvulos de los ovarios y se fecundan con espermatozoides en un laboratorio. Los embriones resultantes se transfieren después al útero. El proceso suele incluir estimulación ovárica, extracción de óvulos, fecundación, cultivo de embriones y transferencia de embriones.",
+        "clinics": "Puedo ayudarles a encontrar clínicas de fertilidad de confianza en su zona. ¿Quieren que busque según su ubicación y sus necesidades específicas?",
+        "document": "¡Con gusto les ayudo a entender sus resultados! Usen el botón de carga de archivos 📎 para compartir su informe de laboratorio.",
+        # The language switch reply from script.py's multilingual_support example,
+        # kept as a literal so chat_server needs neither script.py nor its outputs
+        # (--check compares the two)
+        "language_changed": (
+            "¡Por supuesto! Me complace ayudarles en español. 🇪🇸\n"
+            "\n"
+            "**Idioma cambiado a Español**\n"
+            "\n"
+            "Soy FertilityAI Assistant, su especialista en consultas de FIV. Estoy aquí para brindarles orientación personalizada y apoyo durante su proceso de fertilidad.\n"
+            "\n"
+            "¿En qué puedo ayudarles hoy? Pueden preguntarme sobre:\n"
+            "\n"
+            "🔬 Información sobre tratamientos de FIV\n"
+            "💰 Calculadora de costos\n"
+            "📊 Tasas de éxito personalizadas\n"
+            "📅 Cronograma de tratamiento\n"
+            "🏥 Clínicas especializadas\n"
+            "💙 Apoyo emocional\n"
+            "\n"
+            "*Nota: Puedo cambiar entre idiomas en cualquier momento durante nuestra conversación.*"
+        ),
+    },
+}
+
+# Replies for messages without a recognisable intent (generateBotResponse's list)
+DEFAULT_RESPONSES = {
+    "en": [
+        "I understand your concern. Could you provide more specific details so I can give you the most accurate guidance? I'm here to help with all aspects of your fertility journey.",
+        "That's a great question about fertility treatment. Let me help you understand this better. Would you like me to explain the process step by step?",
+        "I'm here to support you through this journey. Could you tell me more about your specific situation? Every fertility journey is unique.",
+        "Based on your question, I think it would be helpful to discuss this in more detail. What aspect would you like to focus on first - treatment options, costs, or success rates?",
+        "Thank you for sharing that with me. Every fertility journey is unique, and I'm here to provide personalized guidance. What's your main concern right now?",
+        "I appreciate you reaching out. Fertility treatment can feel overwhelming, but you don't have to navigate it alone. How can I best support you today?",
+    ],
+    "es": [
+        "Entiendo su preocupación. ¿Podrían darme más detalles para ofrecerles la orientación más precisa? Estoy aquí para ayudarles con todos los aspectos de su camino hacia la fertilidad.",
+        "Es una excelente pregunta sobre el tratamiento de fertilidad. Permítanme ayudarles a entenderlo mejor. ¿Quieren que les explique el proceso paso a paso?",
+        "Estoy aquí para apoyarles en este camino. ¿Podrían contarme más sobre su situación? Cada camino hacia la fertilidad es único.",
+        "Según su pregunta, creo que sería útil hablarlo con más detalle. ¿Qué aspecto quieren tratar primero: opciones de tratamiento, costos o tasas de éxito?",
+        "Gracias por compartirlo conmigo. Cada camino hacia la fertilidad es único y estoy aquí para ofrecerles orientación personalizada. ¿Cuál es su principal preocupación ahora mismo?",
+        "Agradezco que se hayan comunicado. El tratamiento de fertilidad puede resultar abrumador, pero no tienen que recorrerlo solos. ¿Cómo puedo apoyarles hoy?",
+    ],
+}
+
+
+def compile_catalog(languages=LANGUAGES):
+    # {language: bundle}; keys a language has not translated yet fall back to
+    # English, except the NO_FALLBACK ones
+    english = RESPONSES["en"]
+    catalog = {}
+    for language in languages:
+        translated = RESPONSES.get(language, {})
+        catalog[language] = {
+            "language": language,
+            "responses": {key: translated.get(key, message) for key, message in english.items()
+                          if key in translated or key not in NO_FALLBACK},
+            "defaults": DEFAULT_RESPONSES.get(language, DEFAULT_RESPONSES["en"]),
+        }
+    return catalog
+
+
+def response_table(catalog=None):
+    # Flat {(intent, language): message} table for the chat backend, including
+    # every classifier intent and catalog key, so a reply is one dict lookup
+    catalog = catalog or compile_catalog()
+    table = {}
+    for language, bundle in catalog.items():
+        responses = bundle["responses"]
+        for key, message in responses.items():
+            table[key, language] = message
+        for intent, key in INTENT_KEYS.items():
+            table[intent, language] = responses[key]
+    return table
+
+
+def encode_bundle(bundle):
+    return json.dumps(bundle, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_bundles(out_dir=BUNDLE_DIR, catalog=None):
+    # Writes responses.<language>.<hash>.json per language plus manifest.json and
+    # removes bundles from earlier builds; returns {language: relative path}
+    catalog = catalog or compile_catalog()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {}
+    written = set()
+    for language, bundle in catalog.items():
+        content = encode_bundle(bundle)
+        name = f'responses.{language}.{hashlib.sha256(content).hexdigest()[:10]}.json'
+        with open(os.path.join(out_dir, name), 'wb') as f:
+            f.write(content)
+        manifest[language] = f'{os.path.basename(out_dir)}/{name}'
+        written.add(name)
+    for path in glob.glob(os.path.join(out_dir, 'responses.*.json')):
+        if os.path.basename(path) not in written:
+            os.remove(path)
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def update_app_js(manifest, path=APP_JS):
+    # Points app.js's responseBundles at the freshly hashed bundle names
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    updated, count = re.subn(r'^const responseBundles = .*;$', lambda _: f'const responseBundles = {json.dumps(manifest)};',
+                             source, count=1, flags=re.M)
+    if not count:
+        raise ValueError(f"no responseBundles declaration in {path}")
+    if updated != source:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(updated)
+    return updated != source
+
+
+def app_js_responses(path=APP_JS):
+    # appData.sampleResponses and generateBotResponse's default list from app.js
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    block = re.search(r'sampleResponses: \{(.*?)\n  \}', source, re.S).group(1)
+    samples = {key: json.loads(text) for key, text in re.findall(r'^\s*(\w+): ("(?:\\.|[^"\\])*")', block, re.M)}
+    block = re.search(r'const responses = responseCatalog\.defaults \|\| \[(.*?)\];', source, re.S).group(1)
+    defaults = [json.loads(text) for text in re.findall(r'"(?:\\.|[^"\\])*"', block)]
+    return samples, defaults
+
+
+def check_app_js(path=APP_JS):
+    # RESPONSES["en"] and DEFAULT_RESPONSES["en"] are the same text app.js ships
+    # inline, and the Spanish language switch reply is script.py's example;
+    # returns a description of every difference
+    samples, defaults = app_js_responses(path)
+    english = RESPONSES["en"]
+    differences = [f"sampleResponses.{key} differs" for key in samples if english.get(key) != samples[key]]
+    differences += [f"sampleResponses has no {key}" for key in english
+                    if key not in samples and key not in ("document", "language_changed")]
+    if defaults != DEFAULT_RESPONSES["en"]:
+        differences.append("generateBotResponse default replies differ from DEFAULT_RESPONSES['en']")
+    # Only the check pays for script.py's pandas import
+    from script import conversation_examples
+    if RESPONSES["es"]["language_changed"] != conversation_examples["multilingual_support"][1]["message"]:
+        differences.append("RESPONSES['es']['language_changed'] differs from the multilingual_support example")
+    return differences
+
+
+async def fetch_times(manifest, repeat):
+    # Median time to GET each bundle from a local chat_server over keep-alive HTTP
+    from chat_server import serve
+
+    server = await serve('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    times = {}
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        for language, path in manifest.items():
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                writer.write(f'GET /{path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+                await writer.drain()
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line == b'\r\n':
+                        break
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                json.loads(await reader.readexactly(length))
+                samples.append(time.perf_counter() - started)
+            times[language] = sorted(samples)[len(samples) // 2]
+        writer.close()
+        await writer.wait_closed()
+    return times
+
+
+def report(manifest, out_dir=BUNDLE_DIR, repeat=200):
+    fetched = asyncio.run(fetch_times(manifest, repeat))
+    with open(APP_JS, 'rb') as f:
+        app_js = f.read()
+    print(f"app.js (inline English): {len(app_js):,} bytes, {len(gzip.compress(app_js)):,} gzipped")
+    print(f"{'bundle':<34} {'bytes':>7} {'gzip':>6} {'parse':>9} {'fetch+parse':>12}  translated")
+    english = RESPONSES["en"]
+    for language, path in manifest.items():
+        with open(os.path.join(out_dir, os.path.basename(path)), 'rb') as f:
+            content = f.read()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            json.loads(content)
+        parse = (time.perf_counter() - started) / repeat
+        translated = sum(key in RESPONSES.get(language, {}) for key in english)
+        print(f"{os.path.basename(path):<34} {len(content):>7,} {len(gzip.compress(content)):>6,} "
+              f"{parse * 1e6:>7.1f}us {fetched[language] * 1000:>10.2f}ms  {translated}/{len(english)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the per-language response bundles loaded by app.js")
+    parser.add_argument('--out', default=BUNDLE_DIR, help="bundle directory (served as /locales/)")
+    parser.add_argument('--no-app-js', action='store_true', help="do not rewrite responseBundles in app.js")
+    parser.add_argument('--report', action='store_true', help="print bundle sizes and load times")
+    parser.add_argument('--check', action='store_true', help="check the catalog against app.js and script.py")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        differences = check_app_js()
+        for difference in differences:
+            print(f"MISMATCH {difference}")
+        print("Catalog matches app.js and script.py" if not differences else f"{len(differences)} differences from app.js")
+        return 1 if differences else 0
+
+    manifest = write_bundles(args.out)
+    if not args.no_app_js and update_app_js(manifest):
+        print("Updated responseBundles in app.js")
+    print(f"{len(manifest)} bundles written to {args.out}")
+    if args.report:
+        report(manifest, args.out)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
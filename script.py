@@ -1,6 +1,17 @@
 # Create advanced user interaction examples and conversation flows
 import pandas as pd
+import argparse
 import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from instrumentation import add_arguments, finish, profiler_from_args, stage
 
 # Create comprehensive conversation examples showing advanced interactions
 conversation_examples = {
@@ -79,44 +90,574 @@ advanced_capabilities = {
     }
 }
 
-# Save all data to files
-with open('conversation_examples.json', 'w', encoding='utf-8') as f:
-    json.dump(conversation_examples, f, ensure_ascii=False, indent=2)
+OUTPUT_FILES = [
+    'conversation_examples.json',
+    'user_interaction_patterns.json',
+    'advanced_capabilities.json',
+    'session_types_analysis.csv',
+    'feature_usage_metrics.csv',
+    'user_journey_analysis.csv',
+]
+
+# Streaming mode reads conversation logs as JSONL, one turn per line:
+#   {"session_id": "s-1", "session_type": "Cost Planning", "stage": "Research",
+#    "conversation": "cost_flow", "role": "bot", "message": "...",
+#    "timestamp": "2025-08-26 10:00:05", "features": ["cost_calculator"], "rating": 4.6}
+# Turns with a session_id feed the session/feature/journey aggregates, turns with a
+# conversation name are exported to conversation_examples.json. A rating scores the
+# features of the turn it is attached to. Records must be grouped by session_id
+# (the log exporter writes them that way) so each session is folded in and dropped
+# as soon as the next one starts.
+TURN_FIELDS = ('role', 'message', 'timestamp', 'features')
+
+
+def feature_tag(name):
+    # "Cost Calculator" -> "cost_calculator", the tag used in turn features
+    return name.lower().replace(' ', '_')
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value)
+
+
+def read_log(paths):
+    # Yield log records one at a time so only the current line is held in memory
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def read_log_range(path, start, end):
+    # Records whose line starts inside [start, end) of a JSONL file
+    with open(path, 'rb') as f:
+        if start:
+            # Finish the line straddling start; a no-op when start is a line start
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def plan_shards(paths, workers):
+    # Byte ranges of roughly equal size, in log order, across all input files
+    sizes = [os.path.getsize(path) for path in paths]
+    chunk = max(1, -(-sum(sizes) // workers))
+    shards = []
+    for path, size in zip(paths, sizes):
+        for start in range(0, size, chunk):
+            shards.append((path, start, min(start + chunk, size)))
+    return shards
+
+
+# Ratings are accumulated as integer micro-points and durations as integer seconds,
+# so partial sums merge exactly and results do not depend on how logs are sharded
+RATING_SCALE = 1_000_000
+
+
+class InteractionAggregator:
+    # Incrementally builds the user_interaction_patterns tables from log records.
+    # Type/stage definitions (features_used, duration_days, questions) come from the
+    # reference patterns; percentages, durations, usage rates, satisfaction and
+    # interaction counts are computed from the log.
+    #
+    # A shard aggregator (hold_head=True) keeps its first and last sessions open,
+    # since either may continue in a neighbouring shard; merge_partials() stitches
+    # them back together in log order.
+
+    def __init__(self, reference=user_interaction_patterns, hold_head=False):
+        self.session_types = {row['type']: row for row in reference['session_types']}
+        self.stages = {row['stage']: row for row in reference['user_journey_stages']}
+        self.features = {feature_tag(row['feature']): row['feature'] for row in reference['feature_usage']}
+
+        self.sessions = 0
+        self.type_counts = {}        # type -> [sessions, seconds]
+        self.stage_counts = {}       # stage -> [sessions, user turns]
+        self.feature_sessions = {}   # tag -> sessions using it
+        self.feature_ratings = {}    # tag -> [ratings, micro-point sum]
+        self.head = None
+        self._hold_head = hold_head
+        self._session = None
+
+    def add(self, record):
+        session_id = record.get('session_id')
+        if session_id is None:
+            return
+        session = self._session
+        timestamp = parse_timestamp(record['timestamp'])
+        if session is None or session['id'] != session_id:
+            self._close_session()
+            session = self._session = {
+                'id': session_id,
+                'type': record.get('session_type'),
+                'stage': record.get('stage'),
+                'first': timestamp,
+                'last': timestamp,
+                'user_turns': 0,
+                'features': set(),
+            }
+        session['first'] = min(session['first'], timestamp)
+        session['last'] = max(session['last'], timestamp)
+        if record.get('role') == 'user':
+            session['user_turns'] += 1
+
+        tracked = [tag for tag in record.get('features', ()) if tag in self.features]
+        session['features'].update(tracked)
+        rating = record.get('rating')
+        if rating is not None:
+            points = round(rating * RATING_SCALE)
+            for tag in tracked:
+                totals = self.feature_ratings.setdefault(tag, [0, 0])
+                totals[0] += 1
+                totals[1] += points
+
+    def _close_session(self):
+        session = self._session
+        if session is None:
+            return
+        self._session = None
+        if self._hold_head and self.head is None:
+            self.head = session
+            return
+        self.sessions += 1
+
+        seconds = int((session['last'] - session['first']).total_seconds())
+        if session['type'] is not None:
+            counts = self.type_counts.setdefault(session['type'], [0, 0])
+            counts[0] += 1
+            counts[1] += seconds
+        if session['stage'] is not None:
+            counts = self.stage_counts.setdefault(session['stage'], [0, 0])
+            counts[0] += 1
+            counts[1] += session['user_turns']
+        for tag in session['features']:
+            self.feature_sessions[tag] = self.feature_sessions.get(tag, 0) + 1
+
+    def _continue(self, session):
+        # Feed an open session from a shard, joining it to the current one if the
+        # shard boundary fell in the middle of it
+        current = self._session
+        if current is not None and current['id'] == session['id']:
+            current['type'] = current['type'] if current['type'] is not None else session['type']
+            current['stage'] = current['stage'] if current['stage'] is not None else session['stage']
+            current['first'] = min(current['first'], session['first'])
+            current['last'] = max(current['last'], session['last'])
+            current['user_turns'] += session['user_turns']
+            current['features'] |= session['features']
+            return
+        self._close_session()
+        self._session = session
+
+    def merge(self, other):
+        # Adds the closed-session totals of another aggregator
+        self.sessions += other.sessions
+        for totals, other_totals in ((self.type_counts, other.type_counts),
+                                     (self.stage_counts, other.stage_counts),
+                                     (self.feature_ratings, other.feature_ratings)):
+            for key, values in other_totals.items():
+                current = totals.setdefault(key, [0] * len(values))
+                for i, value in enumerate(values):
+                    current[i] += value
+        for tag, sessions in other.feature_sessions.items():
+            self.feature_sessions[tag] = self.feature_sessions.get(tag, 0) + sessions
+
+    def result(self):
+        self._close_session()
+        total = self.sessions or 1
+
+        session_types = []
+        for name in ordered_keys(self.session_types, self.type_counts):
+            sessions, seconds = self.type_counts[name]
+            session_types.append({
+                "type": name,
+                "percentage": round(100 * sessions / total),
+                "avg_duration_minutes": round(seconds / 60 / sessions),
+                "features_used": self.session_types.get(name, {}).get('features_used', []),
+            })
+
+        feature_usage = []
+        for tag, name in self.features.items():
+            ratings, points = self.feature_ratings.get(tag, (0, 0))
+            feature_usage.append({
+                "feature": name,
+                "usage_rate": round(100 * self.feature_sessions.get(tag, 0) / total),
+                "satisfaction": round(points / RATING_SCALE / ratings, 1) if ratings else None,
+            })
+
+        user_journey_stages = []
+        for name in ordered_keys(self.stages, self.stage_counts):
+            sessions, user_turns = self.stage_counts[name]
+            reference = self.stages.get(name, {})
+            user_journey_stages.append({
+                "stage": name,
+                "duration_days": reference.get('duration_days'),
+                "interactions": round(user_turns / sessions),
+                "questions": reference.get('questions', []),
+            })
+
+        return {
+            "session_types": session_types,
+            "feature_usage": feature_usage,
+            "user_journey_stages": user_journey_stages,
+        }
+
+
+def merge_partials(partials, reference=user_interaction_patterns):
+    # Reduces shard aggregators, given in log order, into one aggregator
+    merged = InteractionAggregator(reference)
+    for partial in partials:
+        if partial.head is not None:
+            merged._continue(partial.head)
+        merged.merge(partial)
+        if partial._session is not None:
+            merged._continue(partial._session)
+    return merged
+
+
+def ordered_keys(reference, counts):
+    # Reference order first, then anything new sorted by name so the order does
+    # not depend on which shard saw it first
+    return [key for key in reference if key in counts] + sorted(key for key in counts if key not in reference)
+
+
+class ConversationExport:
+    # Streams turns into conversation_examples.json. Turns are spilled to one JSONL
+    # file per conversation and re-emitted in chunks, so interleaved conversations
+    # do not need to be buffered in memory. Only the most recently written
+    # MAX_OPEN_SPILLS files stay open; others are reopened for appending.
+
+    MAX_OPEN_SPILLS = 64
+
+    def __init__(self, spill_dir):
+        self.spill_dir = spill_dir
+        self.counts = {}
+        self.spills = {}   # conversation -> spill file paths, in log order
+        self._paths = {}   # conversation -> this export's own spill path
+        self._files = OrderedDict()   # open spills, least recently written first
+
+    def add(self, record):
+        name = record.get('conversation')
+        if name is None:
+            return
+        spill = self._files.get(name)
+        if spill is not None:
+            self._files.move_to_end(name)
+        else:
+            path = self._paths.get(name)
+            if path is None:
+                path = self._paths[name] = os.path.join(self.spill_dir, f'{len(self._paths)}.jsonl')
+                self.spills[name] = [path]
+                self.counts[name] = 0
+                mode = 'w'
+            else:
+                mode = 'a'
+            if len(self._files) >= self.MAX_OPEN_SPILLS:
+                self._files.popitem(last=False)[1].close()
+            spill = self._files[name] = open(path, mode, encoding='utf-8')
+        turn = {key: record[key] for key in TURN_FIELDS if key in record}
+        spill.write(json.dumps(turn, ensure_ascii=False) + '\n')
+        self.counts[name] += 1
+
+    def extend(self, other):
+        # Appends another (closed) export's spills, e.g. from the next shard
+        for name, paths in other.spills.items():
+            self.spills.setdefault(name, []).extend(paths)
+            self.counts[name] = self.counts.get(name, 0) + other.counts[name]
+
+    def write(self, path):
+        # Produces the same bytes as json.dump(..., ensure_ascii=False, indent=2)
+        self.close()
+        with open(path, 'w', encoding='utf-8') as out:
+            if not self.spills:
+                out.write('{}')
+                return
+            out.write('{')
+            for i, (name, paths) in enumerate(self.spills.items()):
+                out.write(',\n  ' if i else '\n  ')
+                out.write(json.dumps(name, ensure_ascii=False) + ': [')
+                first = True
+                for spill_path in paths:
+                    with open(spill_path, encoding='utf-8') as spill:
+                        for line in spill:
+                            turn = json.dumps(json.loads(line), ensure_ascii=False, indent=2)
+                            out.write('\n    ' if first else ',\n    ')
+                            out.write(turn.replace('\n', '\n    '))
+                            first = False
+                out.write('\n  ]')
+            out.write('\n}')
+
+    def close(self):
+        for spill in self._files.values():
+            spill.close()
+        self._files.clear()
+
+
+def aggregate_shard(path, start, end, spill_dir):
+    # Worker entry point: partial aggregates and conversation spills for one shard
+    os.makedirs(spill_dir)
+    aggregator = InteractionAggregator(hold_head=True)
+    export = ConversationExport(spill_dir)
+    try:
+        for record in read_log_range(path, start, end):
+            aggregator.add(record)
+            export.add(record)
+    finally:
+        export.close()
+    return aggregator, export
+
+
+def write_json(path, data):
+    with stage(f'json:{os.path.basename(path)}'), open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_csv(path, rows):
+    with stage(f'csv:{os.path.basename(path)}'):
+        pd.DataFrame(rows).to_csv(path, index=False)
+
+
+def write_outputs(patterns, capabilities, out_dir='.'):
+    # Everything except conversation_examples.json, which each mode writes itself
+    write_json(os.path.join(out_dir, 'user_interaction_patterns.json'), patterns)
+    write_json(os.path.join(out_dir, 'advanced_capabilities.json'), capabilities)
+
+    # Create CSV files for easier analysis
+    write_csv(os.path.join(out_dir, 'session_types_analysis.csv'), patterns['session_types'])
+    write_csv(os.path.join(out_dir, 'feature_usage_metrics.csv'), patterns['feature_usage'])
+    write_csv(os.path.join(out_dir, 'user_journey_analysis.csv'), patterns['user_journey_stages'])
+
+
+def build_in_memory(out_dir='.'):
+    # Save all data to files
+    write_json(os.path.join(out_dir, 'conversation_examples.json'), conversation_examples)
+    write_outputs(user_interaction_patterns, advanced_capabilities, out_dir)
+    return user_interaction_patterns, {name: len(turns) for name, turns in conversation_examples.items()}
+
+
+def build_streaming(paths, out_dir='.', workers=None):
+    with tempfile.TemporaryDirectory() as spill_dir:
+        with stage('aggregate'):
+            if workers:
+                # Shards are reduced in log order, so the output is the same for any
+                # worker count
+                shards = plan_shards(paths, workers)
+                with ProcessPoolExecutor(workers) as pool:
+                    futures = [pool.submit(aggregate_shard, path, start, end, os.path.join(spill_dir, str(i)))
+                               for i, (path, start, end) in enumerate(shards)]
+                    partials = [future.result() for future in futures]
+                aggregator = merge_partials(aggregator for aggregator, _ in partials)
+                export = ConversationExport(spill_dir)
+                for _, shard_export in partials:
+                    export.extend(shard_export)
+            else:
+                aggregator = InteractionAggregator()
+                export = ConversationExport(spill_dir)
+                try:
+                    for record in read_log(paths):
+                        aggregator.add(record)
+                        export.add(record)
+                finally:
+                    export.close()
+        with stage('json:conversation_examples.json'):
+            export.write(os.path.join(out_dir, 'conversation_examples.json'))
+    patterns = aggregator.result()
+    write_outputs(patterns, advanced_capabilities, out_dir)
+    return patterns, export.counts
+
+
+def build_from_archive(path, out_dir='.'):
+    # Aggregates straight from the memory-mapped columns of a conversation_archive
+    # file; only the example conversations are decoded back into records
+    from conversation_archive import ConversationArchive
+    from metrics_engine import compute_patterns
+
+    with ConversationArchive(path) as archive, tempfile.TemporaryDirectory() as spill_dir:
+        with stage('aggregate'):
+            patterns = compute_patterns(archive.metric_columns())
+            export = ConversationExport(spill_dir)
+            try:
+                for record in archive.records(archive.conversation_rows()):
+                    export.add(record)
+            finally:
+                export.close()
+        with stage('json:conversation_examples.json'):
+            export.write(os.path.join(out_dir, 'conversation_examples.json'))
+    write_outputs(patterns, advanced_capabilities, out_dir)
+    return patterns, export.counts
+
+
+def sample_log_records(start="2025-08-26 09:00:00", sessions=100):
+    # Expands the bundled sample data into a JSONL conversation log whose streamed
+    # aggregates reproduce user_interaction_patterns exactly.
+    for name, turns in conversation_examples.items():
+        for turn in turns:
+            yield {"conversation": name, **turn}
+
+    types = [row for row in user_interaction_patterns['session_types'] for _ in range(row['percentage'])]
+    stages = user_interaction_patterns['user_journey_stages']
+    features = user_interaction_patterns['feature_usage']
+    start = parse_timestamp(start)
+    for i in range(sessions):
+        session_type = types[i * len(types) // sessions]
+        stage = stages[i % len(stages)]
+        turns = [{"role": "user", "message": question} for question in
+                 (stage['questions'] * stage['interactions'])[:stage['interactions']]]
+        turns += [{"role": "bot", "message": f"{row['feature']} response", "features": [feature_tag(row['feature'])],
+                   "rating": row['satisfaction']} for row in features if i < row['usage_rate'] * sessions // 100]
+
+        first = start + timedelta(hours=i)
+        step = session_type['avg_duration_minutes'] * 60 / (len(turns) - 1)
+        for j, turn in enumerate(turns):
+            yield {
+                "session_id": f"sample-{i:04d}",
+                "session_type": session_type['type'],
+                "stage": stage['stage'],
+                "timestamp": str(first + timedelta(seconds=round(j * step))),
+                **turn,
+            }
+
+
+def write_sample_log(path, sessions=100):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in sample_log_records(sessions=sessions):
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def differing_outputs(expected_dir, actual_dir):
+    mismatched = []
+    for name in OUTPUT_FILES:
+        with open(os.path.join(expected_dir, name), 'rb') as expected, \
+                open(os.path.join(actual_dir, name), 'rb') as actual:
+            if expected.read() != actual.read():
+                mismatched.append(name)
+    return mismatched
+
+
+def check_streaming(worker_counts=(None, 1, 3)):
+    # Returns the output files where the streamed pipeline (serial, with each
+    # worker count and from a columnar archive) differs from the in-memory one on
+    # the bundled sample data
+    with tempfile.TemporaryDirectory() as tmp:
+        expected_dir = os.path.join(tmp, 'in_memory')
+        os.makedirs(expected_dir)
+        build_in_memory(expected_dir)
+
+        log_path = os.path.join(tmp, 'sample_log.jsonl')
+        write_sample_log(log_path)
+
+        mismatched = []
+        for workers in worker_counts:
+            streamed_dir = os.path.join(tmp, f'streamed_{workers or "serial"}')
+            os.makedirs(streamed_dir)
+            build_streaming([log_path], streamed_dir, workers)
+            mismatched += [f'{name} (workers={workers or "serial"})'
+                           for name in differing_outputs(expected_dir, streamed_dir)]
+
+        from conversation_archive import convert
+        archive_path = os.path.join(tmp, 'sample_log.faiarch')
+        convert(read_log([log_path]), archive_path)
+        archive_dir = os.path.join(tmp, 'archive')
+        os.makedirs(archive_dir)
+        build_from_archive(archive_path, archive_dir)
+        mismatched += [f'{name} (archive)' for name in differing_outputs(expected_dir, archive_dir)]
+        return mismatched
+
+
+def benchmark_workers(sessions, worker_counts=(1, 2, 4, 8)):
+    # Scaling benchmark on a synthetic log; every worker count must produce
+    # byte-identical output
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'sample_log.jsonl')
+        write_sample_log(log_path, sessions)
+        print(f"Log: {sessions:,} sessions, {os.path.getsize(log_path) / 2**20:.1f} MiB")
+
+        baseline = None
+        consistent = True
+        for workers in worker_counts:
+            out_dir = os.path.join(tmp, f'workers_{workers}')
+            os.makedirs(out_dir)
+            started = time.perf_counter()
+            build_streaming([log_path], out_dir, workers)
+            elapsed = time.perf_counter() - started
+            if baseline is None:
+                baseline = (out_dir, elapsed)
+            same = not differing_outputs(baseline[0], out_dir)
+            consistent = consistent and same
+            print(f"  {workers} workers: {elapsed:.2f}s, {baseline[1] / elapsed:.2f}x, "
+                  f"output {'identical' if same else 'DIFFERS'}")
+        return consistent
+
+
+def print_summary(patterns, conversation_counts):
+    print("Advanced User Interaction Examples Created!")
+    print("=" * 50)
+
+    print("\n📱 Interactive Features Demonstrated:")
+    for feature in patterns['feature_usage']:
+        print(f"  • {feature['feature']}: {feature['usage_rate']}% usage rate, {feature['satisfaction']}/5.0 satisfaction")
+
+    print("\n🗣️ Conversation Types Supported:")
+    for conv_type, count in conversation_counts.items():
+        print(f"  • {conv_type.replace('_', ' ').title()}: {count} interaction examples")
+
+    print("\n🤖 Advanced AI Capabilities:")
+    for category, capabilities in advanced_capabilities.items():
+        print(f"  • {category.replace('_', ' ').title()}: {len(capabilities)} capability areas")
 
-with open('user_interaction_patterns.json', 'w', encoding='utf-8') as f:
-    json.dump(user_interaction_patterns, f, ensure_ascii=False, indent=2)
+    print("\n📊 User Journey Analysis:")
+    for stage in patterns['user_journey_stages']:
+        print(f"  • {stage['stage']}: {stage['duration_days']} duration, {stage['interactions']} avg interactions")
 
-with open('advanced_capabilities.json', 'w', encoding='utf-8') as f:
-    json.dump(advanced_capabilities, f, ensure_ascii=False, indent=2)
+    print(f"\nFiles created:")
+    print("• conversation_examples.json - Detailed conversation flows")
+    print("• user_interaction_patterns.json - Usage patterns and metrics")
+    print("• advanced_capabilities.json - AI features and integrations")
+    print("• session_types_analysis.csv - Session type breakdown")
+    print("• feature_usage_metrics.csv - Feature usage statistics")
+    print("• user_journey_analysis.csv - Patient journey stages")
 
-# Create CSV files for easier analysis
-pd.DataFrame(user_interaction_patterns['session_types']).to_csv('session_types_analysis.csv', index=False)
-pd.DataFrame(user_interaction_patterns['feature_usage']).to_csv('feature_usage_metrics.csv', index=False)
-pd.DataFrame(user_interaction_patterns['user_journey_stages']).to_csv('user_journey_analysis.csv', index=False)
 
-print("Advanced User Interaction Examples Created!")
-print("=" * 50)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate FertilityAI interaction examples and usage analytics")
+    parser.add_argument('--logs', nargs='+', metavar='JSONL', help="stream metrics from JSONL conversation logs instead of the bundled data")
+    parser.add_argument('--out', default='.', help="directory for the generated files")
+    parser.add_argument('--archive', metavar='FAIARCH', help="compute metrics from a conversation_archive.py columnar archive")
+    parser.add_argument('--workers', type=int, help="aggregate --logs in N processes over byte-range shards")
+    parser.add_argument('--check', action='store_true', help="verify the streaming pipeline against the in-memory output on the sample data")
+    parser.add_argument('--benchmark-workers', type=int, metavar='SESSIONS', help="time 1/2/4/8 workers on a synthetic log of SESSIONS sessions")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
 
-print("\n📱 Interactive Features Demonstrated:")
-for feature in user_interaction_patterns['feature_usage']:
-    print(f"  • {feature['feature']}: {feature['usage_rate']}% usage rate, {feature['satisfaction']}/5.0 satisfaction")
+    if args.benchmark_workers:
+        return 0 if benchmark_workers(args.benchmark_workers) else 1
 
-print("\n🗣️ Conversation Types Supported:")
-for conv_type, examples in conversation_examples.items():
-    print(f"  • {conv_type.replace('_', ' ').title()}: {len(examples)} interaction examples")
+    if args.check:
+        mismatched = check_streaming()
+        if mismatched:
+            print("Streaming output differs from in-memory output: " + ", ".join(mismatched))
+            return 1
+        print("Streaming output matches in-memory output on the sample data")
+        return 0
 
-print("\n🤖 Advanced AI Capabilities:")
-for category, capabilities in advanced_capabilities.items():
-    print(f"  • {category.replace('_', ' ').title()}: {len(capabilities)} capability areas")
+    os.makedirs(args.out, exist_ok=True)
+    profiler = profiler_from_args('script', args, args.out)
+    with profiler or nullcontext():
+        if args.archive:
+            patterns, conversation_counts = build_from_archive(args.archive, args.out)
+        elif args.logs:
+            patterns, conversation_counts = build_streaming(args.logs, args.out, args.workers)
+        else:
+            patterns, conversation_counts = build_in_memory(args.out)
+        print_summary(patterns, conversation_counts)
+    return finish(profiler, args) if profiler else 0
 
-print("\n📊 User Journey Analysis:")
-for stage in user_interaction_patterns['user_journey_stages']:
-    print(f"  • {stage['stage']}: {stage['duration_days']} duration, {stage['interactions']} avg interactions")
 
-print(f"\nFiles created:")
-print("• conversation_examples.json - Detailed conversation flows")
-print("• user_interaction_patterns.json - Usage patterns and metrics")
-print("• advanced_capabilities.json - AI features and integrations")
-print("• session_types_analysis.csv - Session type breakdown")
-print("• feature_usage_metrics.csv - Feature usage statistics")
-print("• user_journey_analysis.csv - Patient journey stages")
\ No newline at end of file
+if __name__ == '__main__':
+    sys.exit(main())